@@ -3,60 +3,522 @@
 # Author: Nakshatra Ranjan Saha
 # version: 2.0
 
-import warnings
-
-# Suppress specific Pydantic warnings
-warnings.filterwarnings("ignore", category=UserWarning, module="pydantic._internal._config")
-
-
+import os
+import re
 import random
-from retrying import retry
-import cohere
+import sys
+import csv
+import json
+import time
+import asyncio
+import weakref
 import argparse
-from config import COHERE_API_KEY
+from response_cache import ResponseCache, make_cache_key
+from markdown_normalizer import MarkdownNormalizer
+from context_budget import build_context, chunk_markdown, estimate_tokens
+from keyword_extraction import KeywordCorpus, KeywordExtractor
+from job_store import JobStore, make_job_key
+from image_assets import ImageCache, create_image_provider, link_assets
+from memory_budget import ArticleMemory, MemoryLimitError, format_bytes, text_size
+from renderers import get_renderer, write_article
+from retry_policy import RetryPolicy, TokenBucket, record_retry_after
+from metrics import MetricsRecorder, current_topic
 from colorama import Fore, Style, init
 
-# Initialize colorama
-init(autoreset=True)
+# The Cohere SDK (with pydantic and httpx) is only imported when the first model call needs a
+# client, so --help, argument errors and short-lived worker processes start quickly.
+# Check the import time with: python -X importtime -c "import aibag"
+
+# Cohere API key, from CO_API_KEY (as read by the SDK), COHERE_API_KEY or --api_key.
+# config.py is still read as a fallback for older setups.
+COHERE_API_KEY = os.environ.get('CO_API_KEY') or os.environ.get('COHERE_API_KEY')
+
+# Base URL of the Cohere API (CO_API_URL, as read by the SDK); None means the SDK default.
+# Pointing it at a local stand-in lets the pipeline run without a real API key.
+COHERE_BASE_URL = os.environ.get('CO_API_URL')
+
+# Async Cohere API clients, one per event loop. The underlying HTTP connection pool is bound
+# to the loop it was created on, so a client is never shared between loops.
+_async_clients = weakref.WeakKeyDictionary()
+
+def configure_client(api_key=None, base_url=None):
+    """
+    Set the Cohere API key and base URL used by clients created from now on.
+    Args:
+        api_key (str): The Cohere API key (None keeps the current one).
+        base_url (str): The Cohere API base URL (None keeps the current one).
+    """
+    global COHERE_API_KEY, COHERE_BASE_URL
+    COHERE_API_KEY = api_key or COHERE_API_KEY
+    COHERE_BASE_URL = base_url or COHERE_BASE_URL
+
+def get_api_key():
+    """
+    Get the Cohere API key, falling back to config.py when it isn't set in the environment.
+    Returns:
+        str: The API key
+    """
+    global COHERE_API_KEY
+    if COHERE_API_KEY is None:
+        try:
+            from config import COHERE_API_KEY as config_api_key
+        except ImportError:
+            raise ValueError('No Cohere API key: set CO_API_KEY or pass --api_key.') from None
+        COHERE_API_KEY = config_api_key
+    return COHERE_API_KEY
+
+def get_async_client():
+    """
+    Get the async Cohere API client for the running event loop, creating it on first use.
+    Returns:
+        cohere.AsyncClient: The client shared by every model call made on this event loop
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        import warnings
+
+        # Suppress specific Pydantic warnings, raised while the SDK's models are defined
+        warnings.filterwarnings("ignore", category=UserWarning, module="pydantic._internal._config")
+
+        import httpx
+        import cohere
 
-# Initialize the Cohere API client using the provided API key
-co = cohere.Client(api_key=COHERE_API_KEY)
+        # The response hook keeps Retry-After, which the SDK drops from its exceptions
+        httpx_client = httpx.AsyncClient(timeout=300, event_hooks={'response': [record_retry_after]})
+        client = cohere.AsyncClient(api_key=get_api_key(), base_url=COHERE_BASE_URL, httpx_client=httpx_client)
+        _async_clients[loop] = client
+    return client
+
+# Shared retry policy and client-side rate limit for every model call. The limit is in requests
+# per minute and comes from --rate_limit or AIBAG_RATE_LIMIT (unset means no client-side limit).
+retry_policy = RetryPolicy()
+rate_limiter = TokenBucket(float(os.environ['AIBAG_RATE_LIMIT']) if os.environ.get('AIBAG_RATE_LIMIT') else None)
+
+def configure_rate_limit(rate_per_minute=None, max_attempts=None):
+    """
+    Configure the retry policy and client-side rate limit shared by every model call.
+    Args:
+        rate_per_minute (float): The API quota in requests per minute (None keeps the current limit).
+        max_attempts (int): The maximum number of attempts per model call (None keeps the current value).
+    """
+    if rate_per_minute:
+        rate_limiter.configure(rate_per_minute)
+    if max_attempts:
+        retry_policy.max_attempts = max_attempts
+
+def log_retry(attempt, error, delay):
+    """
+    Report a retried model call.
+    """
+    print_warning(f"Model call failed ({error}), retrying in {delay:.1f}s (attempt {attempt + 1} of {retry_policy.max_attempts})...")
+
+# Response cache in front of every model call. The mode is 'use' (read and write), 'refresh'
+# (skip lookups but store fresh responses) or 'off', and is set from the command line.
+CACHE_PATH = os.environ.get('AIBAG_CACHE', os.path.join('.aibag_cache', 'responses.sqlite3'))
+cache_mode = 'use'
+_response_cache = None
+
+def configure_cache(mode='use', path=None):
+    """
+    Configure the response cache used by every model call.
+    Args:
+        mode (str): 'use' to read and write the cache, 'refresh' to bypass lookups but store new
+            responses, or 'off' to disable it.
+        path (str): Path of the cache database (defaults to CACHE_PATH).
+    """
+    global cache_mode, CACHE_PATH, _response_cache
+    if mode not in ('use', 'refresh', 'off'):
+        raise ValueError(f"Invalid cache mode: {mode}")
+    if path and path != CACHE_PATH and _response_cache is not None:
+        _response_cache.close()
+        _response_cache = None
+    cache_mode = mode
+    CACHE_PATH = path or CACHE_PATH
+
+# Checkpoints of every pipeline stage per topic, so a failed or interrupted run resumes from its last
+# completed stage and an article that is already saved is skipped. The mode is 'resume', 'restart'
+# (drop a topic's checkpoints and start over) or 'off', and is set from the command line.
+JOBS_PATH = os.environ.get('AIBAG_JOBS', os.path.join('.aibag_cache', 'jobs.sqlite3'))
+jobs_mode = 'resume'
+_job_store = None
+
+def configure_jobs(mode='resume', path=None):
+    """
+    Configure the job store used to checkpoint and resume articles.
+    Args:
+        mode (str): 'resume' to continue from saved checkpoints, 'restart' to start every article
+            over, or 'off' to disable checkpoints.
+        path (str): Path of the job database (defaults to JOBS_PATH).
+    """
+    global jobs_mode, JOBS_PATH, _job_store
+    if mode not in ('resume', 'restart', 'off'):
+        raise ValueError(f"Invalid jobs mode: {mode}")
+    if path and path != JOBS_PATH and _job_store is not None:
+        _job_store.close()
+        _job_store = None
+    jobs_mode = mode
+    JOBS_PATH = path or JOBS_PATH
+
+def get_job_store():
+    """
+    Get the job store, opening it on first use.
+    Returns:
+        JobStore: The shared job store, or None when checkpoints are turned off
+    """
+    global _job_store
+    if jobs_mode == 'off':
+        return None
+    if _job_store is None:
+        _job_store = JobStore(JOBS_PATH)
+    return _job_store
+
+# Token budgets of the enrichment prompts. The description and keywords are generated from a compact
+# context of the article (outline, key terms, lead paragraphs) and the README reformat works chunk by
+# chunk. 0 sends the whole article. Set with --context_budget / AIBAG_CONTEXT_BUDGET and AIBAG_README_CHUNK.
+CONTEXT_BUDGET = int(os.environ.get('AIBAG_CONTEXT_BUDGET', 800))
+README_CHUNK_TOKENS = int(os.environ.get('AIBAG_README_CHUNK', 1500))
+
+def configure_context_budget(context_tokens=None, readme_chunk_tokens=None):
+    """
+    Configure the token budgets of the enrichment prompts.
+    Args:
+        context_tokens (int): Budget of the article context sent for the description and keywords
+            (None keeps the current value, 0 sends the whole article).
+        readme_chunk_tokens (int): Size of the chunks reformatted for GitHub README output
+            (None keeps the current value, 0 sends the whole article at once).
+    """
+    global CONTEXT_BUDGET, README_CHUNK_TOKENS
+    if context_tokens is not None:
+        CONTEXT_BUDGET = context_tokens
+    if readme_chunk_tokens is not None:
+        README_CHUNK_TOKENS = readme_chunk_tokens
+
+# Ceiling on the text buffers one article may hold at a time (the streamed lines, the enriched markdown,
+# the README copy and the translations), in bytes. An article that needs more fails rather than growing
+# its worker without bound; 0 means no ceiling. Set in MB with --max_memory / AIBAG_MAX_ARTICLE_MEMORY.
+MAX_ARTICLE_MEMORY = int(float(os.environ.get('AIBAG_MAX_ARTICLE_MEMORY', 0)) * 1024 * 1024)
+
+def configure_memory(max_article_mb=None):
+    """
+    Configure the per-article memory ceiling.
+    Args:
+        max_article_mb (float): The ceiling in MB (None keeps the current value, 0 removes it).
+    """
+    global MAX_ARTICLE_MEMORY
+    if max_article_mb is not None:
+        MAX_ARTICLE_MEMORY = int(max_article_mb * 1024 * 1024)
+
+# How the meta keywords and image topics are found: 'llm' asks the model, 'local' extracts them
+# in-process with TF-IDF over earlier articles, and 'hybrid' extracts image topics locally and has
+# the model pick the meta keywords from the local candidates. Set with --keyword_mode / AIBAG_KEYWORD_MODE.
+KEYWORD_MODES = ('llm', 'local', 'hybrid')
+KEYWORD_MODE = os.environ.get('AIBAG_KEYWORD_MODE', 'llm')
+# Document frequencies of the phrases of every generated article, for the local extraction
+KEYWORD_CORPUS_PATH = os.environ.get('AIBAG_KEYWORD_CORPUS', os.path.join('.aibag_cache', 'keyword_corpus.sqlite3'))
+_keyword_extractor = None
+
+def configure_keywords(mode=None, corpus_path=None):
+    """
+    Configure how keywords and image topics are found.
+    Args:
+        mode (str): 'llm', 'local' or 'hybrid' (None keeps the current mode).
+        corpus_path (str): Path of the keyword corpus database (None keeps the current path).
+    """
+    global KEYWORD_MODE, KEYWORD_CORPUS_PATH, _keyword_extractor
+    if mode is not None:
+        if mode not in KEYWORD_MODES:
+            raise ValueError(f"Invalid keyword mode: {mode}")
+        KEYWORD_MODE = mode
+    if corpus_path and corpus_path != KEYWORD_CORPUS_PATH:
+        if _keyword_extractor is not None:
+            _keyword_extractor.corpus.close()
+            _keyword_extractor = None
+        KEYWORD_CORPUS_PATH = corpus_path
+
+def get_keyword_extractor():
+    """
+    Get the local keyword extractor, opening its corpus on first use.
+    Returns:
+        KeywordExtractor: The shared extractor
+    """
+    global _keyword_extractor
+    if _keyword_extractor is None:
+        _keyword_extractor = KeywordExtractor(KeywordCorpus(KEYWORD_CORPUS_PATH))
+    return _keyword_extractor
+
+# Where the heading images come from: 'loremflickr' downloads them, the path of a directory picks local
+# images by file name, and 'link' hot-links loremflickr.com without downloading anything. Downloaded
+# images are validated, cached by keyword and copied next to the article into ASSETS_DIR, which the
+# article links to by relative path. Set with --image_provider / AIBAG_IMAGE_PROVIDER.
+IMAGE_PROVIDER = os.environ.get('AIBAG_IMAGE_PROVIDER', 'loremflickr')
+IMAGE_CACHE_PATH = os.environ.get('AIBAG_IMAGE_CACHE', os.path.join('.aibag_cache', 'images'))
+ASSETS_DIR = 'assets'
+_image_provider = None
+_image_cache = None
+
+def configure_images(provider=None, cache_path=None):
+    """
+    Configure where the heading images come from.
+    Args:
+        provider (str): 'loremflickr', 'link', another registered provider or the path of an image
+            directory (None keeps the current provider).
+        cache_path (str): Directory of the image cache (None keeps the current directory).
+    """
+    global IMAGE_PROVIDER, IMAGE_CACHE_PATH, _image_provider, _image_cache
+    if provider is not None:
+        # Fail on a bad provider now rather than on the first article
+        _image_provider = None if provider == 'link' else create_image_provider(provider)
+        IMAGE_PROVIDER = provider
+    if cache_path and cache_path != IMAGE_CACHE_PATH:
+        if _image_cache is not None:
+            _image_cache.close()
+            _image_cache = None
+        IMAGE_CACHE_PATH = cache_path
+
+def get_image_provider():
+    """
+    Get the image provider, creating it on first use.
+    Returns:
+        The shared image provider, or None when images are hot-linked
+    """
+    global _image_provider
+    if IMAGE_PROVIDER == 'link':
+        return None
+    if _image_provider is None:
+        _image_provider = create_image_provider(IMAGE_PROVIDER)
+    return _image_provider
+
+def get_image_cache():
+    """
+    Get the image cache, opening it on first use.
+    Returns:
+        ImageCache: The shared image cache
+    """
+    global _image_cache
+    if _image_cache is None:
+        _image_cache = ImageCache(IMAGE_CACHE_PATH)
+    return _image_cache
+
+# Timings, token counts, retries and cache hits of every pipeline stage and model call
+metrics = MetricsRecorder()
+
+def billed_tokens(meta):
+    """
+    Read the billed token counts from the meta data of a Cohere response.
+    Args:
+        meta: The `meta` attribute of a Cohere response (may be None).
+    Returns:
+        tuple: (input_tokens, output_tokens), with None for unknown counts
+    """
+    billed_units = getattr(meta, 'billed_units', None)
+    return getattr(billed_units, 'input_tokens', None), getattr(billed_units, 'output_tokens', None)
+
+def get_response_cache():
+    """
+    Get the response cache, opening it on first use.
+    Returns:
+        ResponseCache: The shared cache, or None when caching is turned off
+    """
+    global _response_cache
+    if cache_mode == 'off':
+        return None
+    if _response_cache is None:
+        _response_cache = ResponseCache(CACHE_PATH)
+    return _response_cache
+
+async def acohere_generate(prompt, max_tokens, temperature, model='command-r-plus', task='generate'):
+    """
+    Call the Cohere generate endpoint through the response cache.
+    Args:
+        prompt (str): The prompt to send.
+        max_tokens (int): The maximum number of tokens to generate.
+        temperature (float): The sampling temperature.
+        model (str): The model to use.
+        task (str): What the call is for, used to label its metrics.
+    Returns:
+        str: The generated text
+    """
+    start = time.perf_counter()
+    cache = get_response_cache()
+    key = make_cache_key('generate', model, prompt, temperature, max_tokens)
+    if cache is not None and cache_mode == 'use':
+        cached = cache.get(key)
+        if cached is not None:
+            metrics.record('model_call', task, latency=time.perf_counter() - start, cache_hit=True, bytes=len(cached))
+            return cached
+
+    retries = 0
+
+    def on_retry(attempt, error, delay):
+        nonlocal retries
+        retries += 1
+        log_retry(attempt, error, delay)
+
+    async def call():
+        await rate_limiter.acquire()
+        return await get_async_client().generate(
+            model=model,
+            prompt=prompt,
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+
+    try:
+        response = await retry_policy.run(call, rate_limiter=rate_limiter, on_retry=on_retry)
+    except Exception:
+        metrics.record('model_call', task, latency=time.perf_counter() - start, retries=retries, cache_hit=False, status='error')
+        raise
+    text = response.generations[0].text
+    input_tokens, output_tokens = billed_tokens(getattr(response, 'meta', None))
+    metrics.record('model_call', task, latency=time.perf_counter() - start, retries=retries, cache_hit=False,
+                   bytes=len(text), input_tokens=input_tokens, output_tokens=output_tokens, status='ok')
+
+    if cache is not None:
+        cache.set(key, text)
+    return text
+
+async def close_model_stream(stream):
+    """
+    Stop a Cohere chat stream that is no longer read. The SDK's stream ignores aclose(), as it
+    swallows every exception thrown in at its yield, so its next read is cancelled instead, which
+    ends the stream and closes its connection on the current event loop.
+    Args:
+        stream: The async iterator returned by chat_stream().
+    """
+    while True:
+        read = asyncio.ensure_future(stream.__anext__())
+        # Let the read start before cancelling it; one that completes at once just gives the next event
+        await asyncio.sleep(0)
+        read.cancel()
+        await asyncio.wait([read])
+        if read.cancelled() or read.exception() is not None:
+            return
+
+async def acohere_chat_stream(message, temperature, model='command-r-plus', task='article', memory=None):
+    """
+    Stream a Cohere chat response through the response cache.
+    A cached response is yielded as a single chunk; a fresh one is stored once the stream completes.
+    Retries are left to the caller, since chunks may already have been consumed when a stream fails.
+    Args:
+        message (str): The chat message to send.
+        temperature (float): The sampling temperature.
+        model (str): The model to use.
+        task (str): What the call is for, used to label its metrics.
+        memory (ArticleMemory): Optional memory budget the response is counted against while it is
+            held for the cache (as the 'raw' buffer).
+    Yields:
+        str: Chunks of generated text
+    """
+    start = time.perf_counter()
+    cache = get_response_cache()
+    key = make_cache_key('chat', model, message, temperature)
+    if memory is None:
+        memory = ArticleMemory()
+    if cache is not None and cache_mode == 'use':
+        cached = cache.get(key)
+        if cached is not None:
+            metrics.record('model_call', task, latency=time.perf_counter() - start, cache_hit=True, bytes=len(cached))
+            with memory.holding('raw', cached):
+                yield cached
+            return
+
+    await rate_limiter.acquire()
+    stream = get_async_client().chat_stream(
+        model=model,  # Specify the model to be used for generation
+        message=message,  # Pass the engineered prompt to the API
+        temperature=temperature,  # Set the temperature for creativity
+        chat_history=[],  # No prior chat history
+        prompt_truncation='AUTO'  # Handle prompt truncation automatically
+    )
+
+    # The chunks are only kept when the response goes into the cache
+    chunks = None
+    if cache is not None:
+        chunks = []
+        memory.track('raw', chunks)
+    size = 0
+    input_tokens = output_tokens = None
+    first_token_latency = None
+    finished = False
+    try:
+        async for event in stream:
+            if event.event_type == "text-generation":
+                if first_token_latency is None:
+                    first_token_latency = time.perf_counter() - start
+                size += len(event.text)
+                if chunks is not None:
+                    chunks.append(event.text)
+                    # A list slot per chunk, plus the chunk itself
+                    memory.grow('raw', sys.getsizeof(event.text) + 8)
+                yield event.text
+            elif event.event_type == "stream-end":
+                input_tokens, output_tokens = billed_tokens(getattr(getattr(event, 'response', None), 'meta', None))
+        finished = True
+    except Exception as e:
+        # A failed stream has ended, but one stopped by the memory limit is still open
+        finished = not isinstance(e, MemoryLimitError)
+        memory.release('raw')
+        metrics.record('model_call', task, latency=time.perf_counter() - start, cache_hit=False, status='error')
+        raise
+    finally:
+        if not finished:
+            # The caller stopped reading early, or the memory limit did; release the HTTP response now
+            await close_model_stream(stream)
+            memory.release('raw')
+
+    metrics.record('model_call', task, latency=time.perf_counter() - start, cache_hit=False, bytes=size,
+                   input_tokens=input_tokens, output_tokens=output_tokens, first_token_latency=first_token_latency, status='ok')
+
+    if cache is not None:
+        content = ''.join(chunks)
+        # The joined copy is held next to the chunks until it is stored
+        with memory.holding('raw', size=memory.buffers.get('raw', 0) + text_size(content)):
+            cache.set(key, content)
+
+# Where progress messages are printed (None means stdout). Streaming an article to stdout moves
+# them to stderr so they don't mix with the article.
+LOG_FILE = None
 
 def print_step(step_text):
     """
     Print a step message with Cyan color.
     """
-    print(f"{Fore.CYAN}[*] {step_text}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}[*] {step_text}{Style.RESET_ALL}", file=LOG_FILE)
 
 def print_success(step_text):
     """
     Print a success message with Green color.
     """
-    print(f"{Fore.GREEN}[+] {step_text}{Style.RESET_ALL}")
+    print(f"{Fore.GREEN}[+] {step_text}{Style.RESET_ALL}", file=LOG_FILE)
 
 def print_warning(step_text):
     """
     Print a warning message with Yellow color.
     """
-    print(f"{Fore.YELLOW}[!] {step_text}{Style.RESET_ALL}")
+    print(f"{Fore.YELLOW}[!] {step_text}{Style.RESET_ALL}", file=LOG_FILE)
 
 def print_error(step_text):
     """
     Print an error message with Red color.
     """
-    print(f"{Fore.RED}[X] {step_text}{Style.RESET_ALL}")
+    print(f"{Fore.RED}[X] {step_text}{Style.RESET_ALL}", file=LOG_FILE)
 
-@retry(stop_max_attempt_number=3, wait_fixed=2000)
-def fetch_blog_content(prompt, max_words=None, min_words=None, language='English'):
+async def afetch_blog_content(prompt, max_words=None, min_words=None, language='English', sink=None, memory=None):
     """
-    Generate a blog article based on the provided prompt using the Cohere API.
+    Generate a blog article based on the provided prompt using the async Cohere API.
     Args:
         prompt (str): The topic or prompt for the blog article.
         max_words (int): The maximum number of words for the blog article.
         min_words (int): The minimum number of words for the blog article.
         language (str): The language for the blog article (default is English).
+        sink (MarkdownLineSink): Optional sink fed with each chunk of text as it arrives, which cleans
+            it up line by line; the raw text is then only kept for the response cache.
+        memory (ArticleMemory): Optional memory budget of the article, counting the raw response
+            while it is held for the response cache.
     Returns:
-        str: The generated blog content based on the prompt
+        str: The generated blog content based on the prompt, or None when a sink was given (the
+            sink holds the cleaned lines instead)
     """
     
     # Create a detailed prompt for the Cohere API
@@ -77,28 +539,154 @@ def fetch_blog_content(prompt, max_words=None, min_words=None, language='English
     if min_words:
         engineered_prompt += f"\nMinimum Words: {min_words}"
 
-    # Call the Cohere API to generate the blog content
-    stream = co.chat_stream(
-        model='command-r-plus',  # Specify the model to be used for generation
-        message=engineered_prompt,  # Pass the engineered prompt to the API
-        temperature=0.3,  # Set the temperature for creativity
-        chat_history=[],  # No prior chat history
-        prompt_truncation='AUTO'  # Handle prompt truncation automatically
-    )
+    async def stream_article():
+        # Call the Cohere API to generate the blog content
+        stream = acohere_chat_stream(engineered_prompt, temperature=0.3, memory=memory)
+
+        # Start the streamed output over if this is a retry
+        if sink is not None:
+            sink.restart()
+
+        # Collect the chunks and join them once at the end, rather than growing a string chunk by
+        # chunk; with a sink, only the cleaned lines are kept
+        chunks = []
+        stage['bytes'] = 0
+        try:
+            async for text in stream:
+                stage['bytes'] += len(text)
+                if sink is not None:
+                    sink.feed(text)
+                else:
+                    chunks.append(text)
+        finally:
+            # Close the model stream (and its connection) right away if the sink gives up on it
+            await stream.aclose()
 
-    # Accumulate the generated blog content
-    blog_content = ""
-    for event in stream:
-        if event.event_type == "text-generation":
-            blog_content += event.text
+        if sink is not None:
+            sink.finish()
+            return None
+
+        return ''.join(chunks)
+
+    def on_retry(attempt, error, delay):
+        stage['retries'] += 1
+        log_retry(attempt, error, delay)
+
+    with metrics.stage('generate', retries=0) as stage:
+        # Retry the whole stream on transient failures
+        blog_content = await retry_policy.run(stream_article, rate_limiter=rate_limiter, on_retry=on_retry)
 
     return blog_content
 
-def generate_image_topics(headline):
+def fetch_blog_content(prompt, max_words=None, min_words=None, language='English'):
+    """
+    Synchronous wrapper around afetch_blog_content.
+    """
+    return asyncio.run(afetch_blog_content(prompt, max_words, min_words, language))
+
+class MarkdownLineSink:
+    """
+    Clean up the article line by line as chunks arrive from the model, so the raw text is never
+    held in full. The cleaned lines are counted against the article's memory budget.
+    """
+
+    def __init__(self, prompt, memory=None):
+        """
+        Args:
+            prompt (str): The topic of the article, used as the title if the model gives none.
+            memory (ArticleMemory): Optional memory budget of the article.
+        """
+        self.normalizer = MarkdownNormalizer(prompt)
+        self.memory = memory
+        self.lines = []
+
+    def restart(self):
+        """
+        Discard everything collected so far (called before each attempt of a retried stream).
+        """
+        self.normalizer.reset()
+        self.lines = []
+        if self.memory is not None:
+            self.memory.release('lines')
+
+    def feed(self, text):
+        """
+        Add a chunk of streamed text, keeping every line it completes.
+        """
+        self._write(self.normalizer.feed(text))
+
+    def finish(self):
+        """
+        Keep the remaining lines once the stream has ended.
+        """
+        self._write(self.normalizer.finish())
+
+    def close(self):
+        """
+        Release any resources once the stream is done.
+        """
+
+    def _write(self, lines):
+        if lines:
+            self.lines.extend(lines)
+            if self.memory is not None:
+                # A list slot per line, plus the line itself
+                self.memory.grow('lines', sum(sys.getsizeof(line) + 8 for line in lines))
+
+class MarkdownStreamWriter(MarkdownLineSink):
+    """
+    Clean up the article line by line as chunks arrive from the model and write each finished
+    line straight to the output file or stdout, so readers can start before generation ends.
+    """
+
+    def __init__(self, prompt, path=None, on_lines=None, memory=None):
+        """
+        Args:
+            prompt (str): The topic of the article, used as the title if the model gives none.
+            path (str): The file to write to, or None for stdout.
+            on_lines (function): Optional callback given every batch of finished lines, and None
+                when a retried stream starts over.
+            memory (ArticleMemory): Optional memory budget of the article.
+        """
+        super().__init__(prompt, memory)
+        self.path = path
+        self.file = open(path, 'w', encoding='utf-8') if path else sys.stdout
+        self.on_lines = on_lines
+
+    def restart(self):
+        """
+        Discard everything written so far (called before each attempt of a retried stream).
+        """
+        if self.path:
+            self.file.seek(0)
+            self.file.truncate()
+        elif self.lines:
+            print_warning("The article stream was interrupted, restarting it...")
+        if self.on_lines is not None and self.lines:
+            self.on_lines(None)
+        super().restart()
+
+    def close(self):
+        """
+        Close the output file (stdout is left open).
+        """
+        if self.path:
+            self.file.close()
+
+    def _write(self, lines):
+        if lines:
+            super()._write(lines)
+            self.file.write('\n'.join(lines) + '\n')
+            self.file.flush()
+            if self.on_lines is not None:
+                self.on_lines(lines)
+
+async def agenerate_image_topics(headline, context=None):
     """
-    Generate image topics based on the provided headline using the Cohere API.
+    Generate image topics based on the provided headline using the async Cohere API.
     Args:
         headline (str): The headline or title for the blog article.
+        context (str): Optional article keywords, so the topics fit the whole article.
     Returns:
         str: The generated image topics based on the headline
     """
@@ -107,20 +695,38 @@ def generate_image_topics(headline):
     Generate a list of keywords or topics for images based on the following headline. Provide the topics separated by commas. Here is the headline:
     {headline}
     """
+    if context:
+        topics_prompt += f"\nThe article is about: {context}"
     try:
-        response = co.generate(
-            model='command-r-plus',
-            prompt=topics_prompt,
-            max_tokens=50,
-            temperature=0.5,
-        )
-        topics = response.generations[0].text.strip()
+        topics = (await acohere_generate(topics_prompt, max_tokens=50, temperature=0.5, task='image_topics')).strip()
     except Exception as e:
         print_error(f"Failed to generate image topics: {e}")
         topics = headline  # Fallback to headline as topics if AI fails
 
     return topics
 
+def generate_image_topics(headline, context=None):
+    """
+    Synchronous wrapper around agenerate_image_topics.
+    """
+    return asyncio.run(agenerate_image_topics(headline, context))
+
+def image_keywords(meta_keywords):
+    """
+    Order the image keywords of a heading, starting with a random one.
+    Args:
+        meta_keywords (str): The comma separated image topics or meta keywords.
+    Returns:
+        list: The keywords, each cut to its first three words
+    """
+    keywords_list = [' '.join(keyword.split()[:3]) for keyword in meta_keywords.split(',') if keyword.strip()]
+    if not keywords_list:
+        return ['default']
+    # Choose a single random keyword from the list, seeded by the keywords so that re-rendering
+    # the same article gives the same image (and cached prompts that include it stay valid)
+    first = random.Random(meta_keywords).randrange(len(keywords_list))
+    return keywords_list[first:] + keywords_list[:first]
+
 def generate_image_url(meta_keywords):
     """
     Generate a random image URL based on the provided meta keywords.
@@ -129,24 +735,44 @@ def generate_image_url(meta_keywords):
     Returns:
         str: A random image URL based on the meta keywords
     """
-    
-    # Extract keywords from the meta_keywords
-    keywords_list = [keyword.strip() for keyword in meta_keywords.split(',')]
-    
-    # Choose a single random keyword from the list
-    random_keyword = random.choice(keywords_list) if keywords_list else 'default'
-    
-    # Get the first word from the random keyword
-    random_keyword = random_keyword.split()[0]
-    
-    # Generate the URL with the selected keyword
-    return f"https://loremflickr.com/800/600/{random_keyword.replace(' ', ',')}"
+    # Use up to three words of the chosen keyword as loremflickr tags
+    return f"https://loremflickr.com/800/600/{','.join(image_keywords(meta_keywords)[0].split())}"
 
-def generate_meta_keywords(content):
+async def aresolve_image(meta_keywords):
+    """
+    Find the image of a heading through the image provider, using the local image cache. If the
+    chosen keyword gives no valid image, the other keywords are tried in turn; if none does and the
+    provider is loremflickr, the image is hot-linked instead.
+    Args:
+        meta_keywords (str): The comma separated image topics of the heading.
+    Returns:
+        tuple: (alt text, relative asset path or image URL), or None if no keyword gave an image
     """
-    Generate SEO meta keywords based on the provided content using the Cohere API.
+    provider = get_image_provider()
+    cache = get_image_cache()
+    for keyword in image_keywords(meta_keywords):
+        try:
+            with metrics.stage('image') as stage:
+                cached = cache.get(provider.name, keyword)
+                stage['cache_hit'] = cached is not None
+                if cached is None:
+                    data = await provider.fetch(keyword)
+                    stage['bytes'] = len(data)
+                    cached = cache.put(provider.name, keyword, data)
+        except Exception as e:
+            print_warning(f"No image for '{keyword}': {e}")
+            continue
+        return keyword, f"{ASSETS_DIR}/{cached[0]}"
+    if IMAGE_PROVIDER == 'loremflickr':
+        print_warning("Hot-linking the image from loremflickr.com instead...")
+        return 'Image', generate_image_url(meta_keywords)
+    return None
+
+async def agenerate_meta_keywords(content):
+    """
+    Generate SEO meta keywords based on the provided content using the async Cohere API.
     Args:
-        content (str): The blog content for generating meta keywords.
+        content (str): The blog content, or its compact context, for generating meta keywords.
     Returns:
         str: The generated SEO meta keywords based on the content
     """
@@ -156,301 +782,792 @@ def generate_meta_keywords(content):
     Generate a list of SEO keywords relevant to the following blog content. The keywords should be separated by commas and should be highly relevant to the content. Here is the content:
     {content}
     """
+    return (await acohere_generate(keywords_prompt, max_tokens=50, temperature=0.5, task='keywords')).strip()
+
+async def arefine_meta_keywords(title, candidates):
+    """
+    Pick the SEO meta keywords from locally extracted candidates using the async Cohere API.
+    The prompt only holds the candidates, not the article.
+    Args:
+        title (str): The title of the blog article.
+        candidates (tuple): The candidate keywords, best first.
+    Returns:
+        str: The chosen SEO meta keywords, separated by commas
+    """
+    keywords_prompt = f"""
+    Here are candidate SEO keywords extracted from a blog article titled "{title}". Pick the most relevant ones, fix their capitalization and give them separated by commas, without any extra words. Here are the candidates:
+    {', '.join(candidates)}
+    """
+    return (await acohere_generate(keywords_prompt, max_tokens=50, temperature=0.3, task='keywords')).strip()
+
+def generate_meta_keywords(content):
+    """
+    Synchronous wrapper around agenerate_meta_keywords, which falls back to default keywords on failure.
+    """
     try:
-        response = co.generate(
-            model='command-r-plus',
-            prompt=keywords_prompt,
-            max_tokens=50,
-            temperature=0.5,
-        )
-        keywords = response.generations[0].text.strip()
+        return asyncio.run(agenerate_meta_keywords(content))
     except Exception as e:
         print_error(f"Failed to generate keywords: {e}")
-        keywords = "default, keywords, here"
+        return "default, keywords, here"
 
-    return keywords
+async def agenerate_meta_description(content):
+    """
+    Generate an SEO meta description based on the provided content using the async Cohere API.
+    Args:
+        content (str): The blog content, or its compact context, for generating the meta description.
+    Returns:
+        str: The generated SEO meta description based on the content
+    """
+    description_prompt = f"Generate a brief and relevant meta description for this content. Just give the meta description that is SEO friendly and relevant, don't give any extra words, or any prefix or suffix. Here is the content:\n{content}"
+    description = await acohere_generate(description_prompt, max_tokens=50, temperature=0.5, task='description')
+    return description.strip()
 
-def github_readme_font(content):
+async def agithub_readme_font(content):
     """
-    Convert the blog content into GitHub README specific font formatting.
+    Convert the blog content into GitHub README specific font formatting using the async Cohere API.
+    Long articles are split into chunks of README_CHUNK_TOKENS that are converted concurrently and
+    merged, so the output is never cut short by the per-call token limit.
     Args:
         content (str): The blog content to be converted.
     Returns:
         str: The blog content formatted in Markdown suitable for a GitHub README file.
     """
-    
-    # Generate GitHub README specific font formatting
-    readme_prompt = f"""
-    Convert the following blog content into GitHub README style formatting. The content should be formatted in Markdown suitable for a GitHub README file. Here is the content:
-    {content}
+    chunks = chunk_markdown(content, README_CHUNK_TOKENS)
+
+    async def convert(index, chunk):
+        # Generate GitHub README specific font formatting
+        readme_prompt = f"""
+    Convert the following blog content into GitHub README style formatting. The content should be formatted in Markdown suitable for a GitHub README file. Keep every image link unchanged. Here is the content:
+    {chunk}
+    """
+        if len(chunks) > 1:
+            readme_prompt += f"\nThis is part {index + 1} of {len(chunks)} of the article. Convert only this part, without adding an introduction or a conclusion."
+        # Formatting doesn't shorten the text, so leave room for the whole chunk and its markup
+        max_tokens = min(4000, max(256, 2 * estimate_tokens(chunk)))
+        try:
+            return (await acohere_generate(readme_prompt, max_tokens=max_tokens, temperature=0.5, task='readme')).strip()
+        except Exception as e:
+            raise RuntimeError(f"part {index + 1} of {len(chunks)}: {e}") from e
+
+    readme_parts = await asyncio.gather(*(convert(index, chunk) for index, chunk in enumerate(chunks)))
+    return '\n\n'.join(readme_parts)
+
+def github_readme_font(content):
+    """
+    Synchronous wrapper around agithub_readme_font, which keeps the content unchanged on failure.
     """
     try:
-        response = co.generate(
-            model='command-r-plus',
-            prompt=readme_prompt,
-            max_tokens=1000,
-            temperature=0.5,
-        )
-        readme_content = response.generations[0].text.strip()
+        return asyncio.run(agithub_readme_font(content))
     except Exception as e:
         print_error(f"Failed to generate README formatting: {e}")
-        readme_content = content
+        return content
 
-    return readme_content
+async def atranslate_markdown(content, language, source_language='English'):
+    """
+    Translate markdown into another language using the async Cohere API. Long content is split
+    into chunks of README_CHUNK_TOKENS that are translated concurrently and merged.
+    Args:
+        content (str): The markdown to translate.
+        language (str): The target language.
+        source_language (str): The language of the content.
+    Returns:
+        str: The translated markdown, with the same headings and image links
+    """
+    chunks = chunk_markdown(content, README_CHUNK_TOKENS)
 
+    async def translate(chunk):
+        translate_prompt = f"""
+    Translate the following {source_language} blog content into {language}. Keep the Markdown formatting, the heading levels and every image link exactly as they are, and only give the translation. Here is the content:
+    {chunk}
+    """
+        # Translations can take more tokens than the original, so leave room for twice the chunk
+        max_tokens = min(4000, max(256, 2 * estimate_tokens(chunk)))
+        return (await acohere_generate(translate_prompt, max_tokens=max_tokens, temperature=0.3, task='translate')).strip()
 
-    try:
-        # Log step: Starting blog content generation
-        print_step(f"Generating blog content for the topic: {prompt}")
-
-        # Fetch blog content with retry
-        blog_content = fetch_blog_content(prompt, max_words, min_words, language)
-
-        # Log step: Cleaning up blog content
-        print_step("Cleaning up the generated blog content...")
-        
-        # Clean up the blog content by removing unwanted prefixes and adjusting markdown formatting
-        blog_content = blog_content.replace("## Outline:", "").strip()
-        blog_content = blog_content.replace("## Article:", "").strip()
-        blog_content = blog_content.replace("#### H4:", "####")
-        blog_content = blog_content.replace("### H3:", "###")
-        blog_content = blog_content.replace("## H2:", "##")
-        blog_content = blog_content.replace("# H1:", "#")
-
-        # Ensure the first line is a top-level heading
-        if not blog_content.startswith("# "):
-            blog_content = f"# {prompt}\n\n" + blog_content
-
-        # Remove trailing punctuation from headings
-        lines = blog_content.split('\n')
-        for i in range(len(lines)):
-            if lines[i].startswith('#'):
-                lines[i] = lines[i].rstrip(':')
-
-        # Generate meta keywords
-        meta_keywords = generate_meta_keywords(blog_content)
-
-        # Replace section headings with image placeholders from loremflickr.com
-        for i, line in enumerate(lines):
-            if line.startswith('# '):  # Heading line
-                section_title = line[2:]  # Remove the '# ' prefix
-                image_topics = generate_image_topics(section_title)
-                image_url = generate_image_url(image_topics, meta_keywords)
-                lines[i] = f'{line}\n![Image]({image_url})'
-
-        # Join the lines to form the final Markdown content
-        markdown_content = '\n'.join(lines)
-
-        # Generate SEO meta description
-        description_prompt = f"Generate a brief and relevant meta description for this content. Just give the meta description that is SEO friendly and relevant, don't give any extra words, or any prefix or suffix. Here is the content:\n{markdown_content}"
-        try:
-            description_response = co.generate(
-                model='command-r-plus',
-                prompt=description_prompt,
-                max_tokens=50,
-                temperature=0.5,
-            )
-            description = description_response.generations[0].text.strip()
-        except Exception as e:
-            print_error(f"Failed to generate description: {e}")
-            description = "Default SEO description"
+    return '\n\n'.join(await asyncio.gather(*(translate(chunk) for chunk in chunks)))
 
-        # Convert to GitHub README style if requested
-        if output_format.lower() == 'github':
-            markdown_content = github_readme_font(markdown_content)
+async def atranslate_text(text, language, source_language='English'):
+    """
+    Translate a short text, such as a meta description or keyword list, using the async Cohere API.
+    Args:
+        text (str): The text to translate.
+        language (str): The target language.
+        source_language (str): The language of the text.
+    Returns:
+        str: The translated text
+    """
+    translate_prompt = f"Translate the following {source_language} text into {language}. Keep any commas separating items, and only give the translation, without any prefix or suffix. Here is the text:\n{text}"
+    max_tokens = min(400, max(50, 2 * estimate_tokens(text)))
+    return (await acohere_generate(translate_prompt, max_tokens=max_tokens, temperature=0.3, task='translate')).strip()
 
-        # Log step: Creating the output file
-        print_step(f"Creating the output file in {output_format} format...")
+async def atranslate_article(article, language):
+    """
+    Derive a locale variant of a finished article. The markdown, description and keywords are
+    translated concurrently, and the images chosen for the original are kept.
+    Args:
+        article (dict): The article, with 'title', 'description', 'keywords', 'language' and 'markdown' keys.
+        language (str): The target language.
+    Returns:
+        dict: The translated article, with the same keys
+    """
+    source_language = article.get('language') or 'English'
+    markdown, description, keywords = await asyncio.gather(
+        atranslate_markdown(article['markdown'], language, source_language),
+        atranslate_text(article['description'], language, source_language),
+        atranslate_text(article['keywords'], language, source_language),
+    )
+    # The translated top-level heading is the title of the variant
+    first_line = markdown.split('\n', 1)[0]
+    title = first_line[2:].strip() if first_line.startswith('# ') else article['title']
+    return {
+        'title': title,
+        'description': description,
+        'keywords': keywords,
+        'language': language,
+        'markdown': markdown,
+    }
 
-        # Generate the output file based on the requested format
-        try:
-            if output_format.lower() == 'html':
-                output_file = f"{file_name or prompt}.html"
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write('<!DOCTYPE html>\n')
-                    f.write('<html lang="en">\n<head>\n')
-                    f.write(f'<meta charset="UTF-8">\n')
-                    f.write(f'<meta name="description" content="{description}">\n')
-                    f.write(f'<meta name="keywords" content="{meta_keywords}">\n')
-                    f.write('<meta name="viewport" content="width=device-width, initial-scale=1.0">\n')
-                    f.write(f'<title>{prompt}</title>\n')
-                    f.write('</head>\n<body>\n')
-                    f.write('<h1>' + prompt + '</h1>\n')
-                    f.write('<markdown>\n')
-                    f.write(markdown_content)
-                    f.write('\n</markdown>\n')
-                    f.write('<script src="https://cdn.jsdelivr.net/gh/OCEANOFANYTHINGOFFICIAL/mdonhtml.js/scripts/mdonhtml.min.js"></script>\n')
-                    f.write('\n</body>\n</html>')
-            elif output_format.lower() in ['md', 'github']:
-                output_file = f"{file_name or prompt}.md"
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write(markdown_content)
-            else:
-                print_error(f"Invalid output format: {output_format}")
-        except Exception as e:
-            print_error(f"Failed to save the blog content: {e}")
+def slugify(text):
+    """
+    Turn free text into a file name part that can't leave its directory, e.g. '../Solar Panels' -> 'solar-panels'.
+    Args:
+        text (str): A topic or language name.
+    Returns:
+        str: The lowercase words of the text joined by dashes
+    """
+    return re.sub(r'\W+', '-', text.lower()).strip('-_') or 'article'
 
-    except Exception as e:
-        print_error(f"Failed to generate the blog: {e}")
+def output_paths(base, extension, translations=()):
+    """
+    Build the output path of an article and of its translated variants.
+    Args:
+        base (str): The output path without its extension (the file name or the topic).
+        extension (str): The file extension of the output format.
+        translations (list): The languages of the translated variants.
+    Returns:
+        tuple: (the article path, a dict mapping every translation language to its variant path)
+    """
+    return f"{base}.{extension}", {other: f"{base}.{slugify(other)}.{extension}" for other in translations}
 
-def generate_blog(prompt, max_words=None, min_words=None, output_format='HTML', file_name=None, language='English'):
+def clean_blog_content(blog_content, prompt):
+    """
+    Clean up the generated blog content by removing unwanted prefixes and adjusting markdown formatting.
+    Args:
+        blog_content (str): The raw content returned by the model.
+        prompt (str): The topic of the article, used as the title if the model gives none.
+    Returns:
+        list: The cleaned lines of the article
+    """
+    # Log step: Cleaning up blog content
+    print_step("Cleaning up the generated blog content...")
+
+    with metrics.stage('clean', bytes=len(blog_content)):
+        lines = MarkdownNormalizer(prompt).normalize(blog_content)
+
+    print_success("Blog content cleaned up successfully!")
+
+    return lines
+
+def memoize_calls():
+    """
+    Create a per-article memo for async model calls.
+    The returned function starts `func(*args)` the first time it sees a (func, args) pair and hands
+    the same future to every later caller, including callers that arrive while it is still running.
+    Returns:
+        function: A `call_once(func, *args)` function returning an awaitable result
+    """
+    futures = {}
+
+    def call_once(func, *args):
+        key = (func, args)
+        if key not in futures:
+            futures[key] = asyncio.ensure_future(func(*args))
+        return futures[key]
+
+    return call_once
+
+async def run_dependency_graph(graph, stage_prefix='step.'):
+    """
+    Run a graph of async steps, starting each step as soon as the steps it depends on are done.
+    Independent steps run concurrently, so the graph takes as long as its slowest path.
+    Args:
+        graph (dict): Maps a step name to a (dependencies, func, fallback) tuple. `func` is a
+            coroutine function called with the results of its dependencies, in order. If it
+            raises, `fallback` is called with the exception followed by the same dependency
+            results, and its return value is used instead.
+        stage_prefix (str): Prefix of the metrics stage recorded for each step.
+    Returns:
+        dict: The result of every step, keyed by step name
+    """
+    results = {}
+    tasks = {}
+
+    async def run_step(name):
+        dependencies, func, fallback = graph[name]
+        await asyncio.gather(*(tasks[dependency] for dependency in dependencies))
+        inputs = [results[dependency] for dependency in dependencies]
+        with metrics.stage(stage_prefix + name) as stage:
+            try:
+                results[name] = await func(*inputs)
+            except Exception as e:
+                stage['status'] = 'fallback'
+                results[name] = fallback(e, *inputs)
+
+    # Every task is created before any of them runs, so dependencies can be looked up by name
+    for name in graph:
+        tasks[name] = asyncio.ensure_future(run_step(name))
+    await asyncio.gather(*tasks.values())
+
+    return results
+
+async def agenerate_blog(prompt, max_words=None, min_words=None, output_format='HTML', file_name=None, language='English', raise_errors=False, stream=False, keyword_mode=None, translations=None, on_lines=None, memory=None):
     """
     Generate a blog article based on the provided prompt and save it to an output file.
+    Every model call is awaited on the async Cohere client, so many articles can be in flight
+    on one event loop.
     Args:
         prompt (str): The topic or prompt for the blog article.
         max_words (int): The maximum number of words for the blog article.
         min_words (int): The minimum number of words for the blog article.
-        output_format (str): The output format for the blog article (HTML, Markdown, GitHub).
+        output_format (str): The output format for the blog article (HTML, Markdown, GitHub, JSON).
         file_name (str): The name of the output file to be generated.
         language (str): The language for the blog article (default is English).
+        raise_errors (bool): Re-raise failures instead of only logging them (used by batch mode).
+        stream (bool): Write the cleaned markdown to the output file (or stdout if file_name is '-')
+            while it is generated; the finished document replaces it at the end.
+        keyword_mode (str): 'llm', 'local' or 'hybrid' keyword and image topic extraction
+            (defaults to KEYWORD_MODE).
+        translations (list): Other languages to publish the article in. The article is generated
+            once in `language` and each variant is translated from it, keeping its images, and
+            saved as "<file name>.<language>.<extension>".
+        on_lines (function): With stream, a callback also given every batch of cleaned lines as they
+            are written (and None if a retried stream starts over), e.g. to forward them to a client.
+        memory (ArticleMemory): The memory budget the article's buffers are counted against, shared
+            with a caller that holds buffers of its own (a new one with MAX_ARTICLE_MEMORY by default).
     Returns:
-        None
+        str: The path of the saved output file, or None if the blog could not be saved. With
+            translations, a dict mapping every language to its output path (None if it failed).
     """
     
+    output_file = None
+    # Output paths of the translated variants, by language
+    variant_files = {}
+    translations = [other for other in dict.fromkeys(translations or ()) if other != language]
+    job_key = None
+    job_error = None
+    # Label every metric recorded while generating this article with its topic
+    topic_token = current_topic.set(prompt)
+    # Size of the article's text buffers, reported with its metrics and checked against the ceiling
+    if memory is None:
+        memory = ArticleMemory(MAX_ARTICLE_MEMORY)
+    article_start = time.perf_counter()
     try:
-        # Log step: Starting blog content generation
-        print_step(f"Generating blog content for the topic: {prompt}")
-
-        # Fetch blog content with retry
-        blog_content = fetch_blog_content(prompt, max_words, min_words, language)
-        
-        print_success("Blog content generated successfully!")
-
-        # Log step: Cleaning up blog content
-        print_step("Cleaning up the generated blog content...")
-        
-        # Clean up the blog content by removing unwanted prefixes and adjusting markdown formatting
-        blog_content = blog_content.replace("## Outline:", "").strip()
-        blog_content = blog_content.replace("## Article:", "").strip()
-        blog_content = blog_content.replace("#### H4:", "####")
-        blog_content = blog_content.replace("### H3:", "###")
-        blog_content = blog_content.replace("## H2:", "##")
-        blog_content = blog_content.replace("# H1:", "#")
-        
-        print_success("Blog content cleaned up successfully!")
-
-        # Ensure the first line is a top-level heading
-        if not blog_content.startswith("# "):
-            blog_content = f"# {prompt}\n\n" + blog_content
-
-        # Remove trailing punctuation from headings
-        lines = blog_content.split('\n')
-        for i in range(len(lines)):
-            if lines[i].startswith('#'):
-                lines[i] = lines[i].rstrip(':')
-
-        # Replace section headings with image placeholders from loremflickr.com
-        
-        print_step("Generating & inserting image into the blog...")
-        try:
-            for i, line in enumerate(lines):
-                if line.startswith('# '):  # Heading line
-                    section_title = line[2:]  # Remove the '# ' prefix
-                    meta_keywords = generate_meta_keywords(blog_content)
-                    image_url = generate_image_url(meta_keywords)
-                    lines[i] = f'{line}\n![Image]({image_url})'
-            # Join the lines to form the final Markdown content
-            markdown_content = '\n'.join(lines)
+        # Check the options before paying for a generation
+        extension, _ = get_renderer(output_format)
+        keyword_mode = keyword_mode or KEYWORD_MODE
+        if keyword_mode not in KEYWORD_MODES:
+            raise ValueError(f"Invalid keyword mode: {keyword_mode}")
+
+        # Load the checkpoints of earlier runs of this article
+        store = get_job_store()
+        checkpoints = {}
+        if store is not None:
+            job_key = make_job_key(prompt, max_words, min_words, language)
+            checkpoints = store.start(job_key, prompt, restart=jobs_mode == 'restart')
+            memory.track('checkpoints', list(checkpoints.values()))
+
+        def checkpoint(stage, value):
+            if store is not None:
+                store.save(job_key, stage, value)
+
+        def save_lines(lines):
+            normalized = '\n'.join(lines)
+            with memory.holding('normalized', normalized):
+                checkpoint('normalized', normalized)
+
+        # The steps that fell back; an article that used a fallback is not saved as rendered
+        fallbacks = []
+
+        def checkpointed(stage, func, encode=str, decode=str):
+            # A step that returns its saved output if an earlier run completed it; fallback
+            # results are never saved, so a resumed run tries the step again. Nor are results
+            # finished after a fallback, which may have been built on it
+            async def step(*inputs):
+                if stage in checkpoints:
+                    return decode(checkpoints[stage])
+                result = await func(*inputs)
+                if not fallbacks:
+                    checkpoint(stage, encode(result))
+                return result
+            return step
+
+        def noting(name, fallback):
+            def step_fallback(e, *inputs):
+                fallbacks.append(name)
+                return fallback(e, *inputs)
+            return step_fallback
+
+        output_path, variant_paths = output_paths(file_name or prompt, extension, translations)
+        if stream and file_name == '-':
+            if translations:
+                raise ValueError('Translated variants cannot be streamed to stdout.')
+            output_path = None
+        # The images depend on the keyword mode and image provider, and the rendered file also on the
+        # format (md and github share .md), so all of them are part of the checkpoint names
+        image_settings = f"{keyword_mode}.{IMAGE_PROVIDER}"
+        render_stage = f"rendered.{output_format.lower()}.{image_settings}"
+        rendered = {render_stage: output_path}
+        rendered.update((f'{render_stage}.{other}', path) for other, path in variant_paths.items())
+        if output_path and all(checkpoints.get(stage) == path and os.path.exists(path) for stage, path in rendered.items()):
+            output_file = output_path
+            variant_files = variant_paths
+            print_success(f"Blog already generated: {output_file} (use --restart to generate it again)")
+            return {language: output_file, **variant_files} if translations else output_file
+
+        if 'normalized' in checkpoints or 'raw' in checkpoints:
+            print_success(f"Resuming the saved blog content for the topic: {prompt}")
+            if 'normalized' in checkpoints:
+                lines = checkpoints['normalized'].split('\n')
+            else:
+                # Saved by earlier versions, which kept the raw content before cleaning it
+                lines = clean_blog_content(checkpoints['raw'], prompt)
+                save_lines(lines)
+            memory.track('lines', lines)
+            # The saved text isn't needed once it is split into lines
+            checkpoints.pop('normalized', None)
+            checkpoints.pop('raw', None)
+            memory.track('checkpoints', list(checkpoints.values()))
+            if stream and file_name == '-':
+                # Readers of stdout still get the whole article before its metadata
+                print(*lines, sep='\n', flush=True)
+            if stream and on_lines is not None:
+                on_lines(lines)
+        else:
+            # Log step: Starting blog content generation
+            print_step(f"Generating blog content for the topic: {prompt}")
+
+            # The content is cleaned up line by line as it arrives, so the raw text is only held for the response cache
+            if stream:
+                sink = MarkdownStreamWriter(prompt, output_path, on_lines, memory)
+            else:
+                sink = MarkdownLineSink(prompt, memory)
+            try:
+                # Fetch blog content with retry, writing it out as it arrives when streaming
+                await afetch_blog_content(prompt, max_words, min_words, language, sink=sink, memory=memory)
+            finally:
+                sink.close()
+            print_success("Blog content generated and streamed successfully!" if stream else "Blog content generated successfully!")
+            lines = sink.lines
+            save_lines(lines)
+
+        # The description and keywords only need the gist of the article, not all of it
+        with metrics.stage('context') as stage, memory.holding('context', size=memory.buffers.get('lines', 0)):
+            # build_context joins the lines into one text while it works
+            article_context = build_context(lines, prompt, CONTEXT_BUDGET)
+            stage['bytes'] = len(article_context)
+
+        # Model calls made while enriching this article; each distinct request runs only once
+        call_once = memoize_calls()
+
+        # Post-generation enrichment runs as a dependency graph: description, keywords and the local
+        # term extraction only need the cleaned article, so they run in parallel; images build on the
+        # keywords (or the local terms) and the README reformat waits for images.
+
+        def learn_terms(extractor, clean_content):
+            # Every article joins the corpus used for the IDF once, whatever the keyword mode of the
+            # run that adds it (a resumed run has it in its checkpoints)
+            if 'learned' not in checkpoints and 'terms' not in checkpoints:
+                extractor.learn(clean_content)
+                checkpoint('learned', 'true')
+
+        async def extract_terms():
+            # Rank the article's own phrases locally. The TF-IDF and corpus work is CPU and SQLite
+            # bound, so it runs on a worker thread instead of blocking the other articles.
+            extractor = get_keyword_extractor()
+            clean_content = '\n'.join(lines)
+            with memory.holding('terms', clean_content):
+                def extract():
+                    terms = extractor.extract(clean_content)
+                    learn_terms(extractor, clean_content)
+                    return terms
+                return await asyncio.to_thread(extract)
+
+        def terms_fallback(e):
+            print_error(f"Failed to extract keywords locally: {e}")
+            return []
+
+        async def learn_article():
+            # With model keywords, the article only has to join the corpus
+            clean_content = '\n'.join(lines)
+            with memory.holding('terms', clean_content):
+                await asyncio.to_thread(learn_terms, get_keyword_extractor(), clean_content)
+
+        def learn_fallback(e):
+            print_error(f"Failed to add the article to the keyword corpus: {e}")
+
+        async def insert_images(headline_topics):
+            # Add an image under every section heading. Each heading's image is resolved as soon as
+            # its topics are known, concurrently with the other headings.
+            print_step("Generating & inserting image into the blog...")
+            headings = [i for i, line in enumerate(lines) if line.startswith('# ')]
+
+            async def heading_image(headline):
+                image_topics = await headline_topics(headline)
+                if get_image_provider() is None:
+                    return 'Image', generate_image_url(image_topics)
+                return await call_once(aresolve_image, image_topics)
+
+            images = await asyncio.gather(*(heading_image(lines[i][2:]) for i in headings))
+            image_lines = list(lines)
+            for i, image in zip(headings, images):
+                if image is not None:
+                    image_lines[i] = f'{lines[i]}\n![{image[0]}]({image[1]})'
             print_success("Image generated and inserted successfully!")
-        except Exception as e:
+            # Join the lines to form the final Markdown content
+            with memory.holding('image_lines', size=sys.getsizeof(image_lines)):
+                markdown_content = '\n'.join(image_lines)
+                memory.track('markdown', markdown_content)
+            return markdown_content
+
+        async def model_images(meta_keywords):
+            # Heading-specific topics, built from the article keywords shared with the metadata step
+            return await insert_images(lambda headline: call_once(agenerate_image_topics, headline, meta_keywords))
+
+        async def local_images(terms):
+            async def headline_topics(headline):
+                return ', '.join(get_keyword_extractor().image_topics(headline, terms)) or headline
+            return await insert_images(headline_topics)
+
+        def images_fallback(e, keywords_or_terms):
             print_error(f"Failed to generate and insert image: {e}")
             print_warning("Continuing without inserting images...")
-            pass
-        
-        # Generate SEO meta description
-        print_step(f"Generating SEO meta description for the blog: {prompt}")
-        
-        description_prompt = f"Generate a brief and relevant meta description for this content. Just give the meta description that is SEO friendly and relevant, don't give any extra words, or any prefix or suffix. Here is the content:\n{markdown_content}"
-        try:
-            description_response = co.generate(
-                model='command-r-plus',
-                prompt=description_prompt,
-                max_tokens=50,
-                temperature=0.5,
-            )
-            description = description_response.generations[0].text.strip()
+            markdown_content = '\n'.join(lines)
+            memory.track('markdown', markdown_content)
+            return markdown_content
+
+        async def describe():
+            # Generate SEO meta description
+            print_step(f"Generating SEO meta description for the blog: {prompt}")
+            description = await call_once(agenerate_meta_description, article_context)
             print_success("SEO meta description generated successfully!")
-        except Exception as e:
+            return description
+
+        def description_fallback(e):
             print_error(f"Failed to generate description: {e}")
-            # Fallback to a default description which is the title of the blog separated by commas
+            # Fallback to a default description which is the title of the blog
             description = str(prompt)
             print_warning(f"Using the default description: {description}")
+            return description
 
-        # Generate meta keywords
-        print_step(f"Generating meta keywords for the blog: {prompt}")
-        
-        try:
-            meta_keywords = generate_meta_keywords(markdown_content)
+        async def keywords():
+            # Generate meta keywords
+            print_step(f"Generating meta keywords for the blog: {prompt}")
+            meta_keywords = await call_once(agenerate_meta_keywords, article_context)
             print_success("Meta keywords generated successfully!")
-        except Exception as e:
+            return meta_keywords
+
+        async def local_keywords(terms):
+            print_step(f"Extracting meta keywords for the blog: {prompt}")
+            if not terms:
+                raise ValueError("no keywords found in the article")
+            meta_keywords = ', '.join(terms)
+            if keyword_mode == 'hybrid':
+                # The model only sees the candidates, so the call is small
+                meta_keywords = await call_once(arefine_meta_keywords, prompt, tuple(terms))
+            print_success("Meta keywords generated successfully!")
+            return meta_keywords
+
+        def keywords_fallback(e, *terms):
             print_error(f"Failed to generate keywords: {e}")
+            # A failed refinement still leaves the extracted keywords, which beat the title
+            if terms and terms[0]:
+                meta_keywords = ', '.join(terms[0])
+                print_warning(f"Using the extracted meta keywords: {meta_keywords}")
+                return meta_keywords
             meta_keywords = ', '.join(prompt.split())
             print_warning(f"Using the blog title as meta keywords: {meta_keywords}")
-        
+            return meta_keywords
 
+        async def readme(markdown_content):
+            # Convert to GitHub README style
+            markdown_content = await call_once(agithub_readme_font, markdown_content)
+            memory.track('readme', markdown_content)
+            print_success("GitHub README formatting applied successfully!")
+            return markdown_content
+
+        # Keywords depend on the keyword mode, and the images and the README reformat also on the image
+        # provider, so their checkpoints do too
+        graph = {
+            'description': ((), checkpointed('description', describe), description_fallback),
+        }
+        if keyword_mode == 'llm':
+            graph['learn'] = ((), learn_article, learn_fallback)
+            graph['keywords'] = ((), checkpointed(f'keywords.{keyword_mode}', keywords), keywords_fallback)
+            graph['markdown'] = (('keywords',), checkpointed(f'markdown.{image_settings}', model_images), images_fallback)
+        else:
+            graph['terms'] = ((), checkpointed('terms', extract_terms, json.dumps, json.loads), terms_fallback)
+            graph['keywords'] = (('terms',), checkpointed(f'keywords.{keyword_mode}', local_keywords), keywords_fallback)
+            graph['markdown'] = (('terms',), checkpointed(f'markdown.{image_settings}', local_images), images_fallback)
         # Convert to GitHub README style if requested
         if output_format.lower() == 'github':
-            try:
-                markdown_content = github_readme_font(markdown_content)
-                print_success("GitHub README formatting applied successfully!")
-            except Exception as e:
+            def readme_fallback(e, markdown_content):
                 print_error(f"Failed to apply GitHub README formatting: {e}")
                 print_warning("Continuing without GitHub README formatting...")
-                pass
+                return markdown_content
+
+            graph['readme'] = (('markdown',), checkpointed(f'readme.{image_settings}', readme), readme_fallback)
+
+        graph = {name: (dependencies, func, noting(name, fallback)) for name, (dependencies, func, fallback) in graph.items()}
+        results = await run_dependency_graph(graph, stage_prefix='enrich.')
+        markdown_content = results.get('readme', results['markdown'])
+        description = results['description']
+        meta_keywords = results['keywords']
+        # The lines, the markdown with images and its README copy were all held by the end of the graph;
+        # from here on only the final markdown is
+        memory.track('markdown', results['markdown'])
+        memory.track('readme', results.get('readme'))
+        lines = results = None
+        memory.release('lines')
+        memory.release('readme')
+        memory.track('markdown', markdown_content)
+
+        async def translate_variants(article):
+            # Locale variants are translated from the finished article concurrently; a saved
+            # translation is reused as long as the article it came from hasn't changed
+            print_step(f"Translating the blog into {', '.join(translations)}...")
+            source = make_cache_key('article', language, json.dumps(article, sort_keys=True, ensure_ascii=False), None)
+
+            async def translate(other):
+                saved = checkpoints.get(f'translation.{other}')
+                if saved:
+                    variant = json.loads(saved)
+                    if variant.pop('source', None) == source:
+                        return variant
+                try:
+                    variant = await atranslate_article(article, other)
+                except Exception as e:
+                    print_error(f"Failed to translate the blog into {other}: {e}")
+                    return None
+                checkpoint(f'translation.{other}', json.dumps(dict(variant, source=source), ensure_ascii=False))
+                return variant
+
+            with metrics.stage('translate') as stage:
+                variants = dict(zip(translations, await asyncio.gather(*(translate(other) for other in translations))))
+                stage['bytes'] = sum(len(variant['markdown']) for variant in variants.values() if variant)
+            memory.track('translations', [variant['markdown'] for variant in variants.values() if variant])
+            return variants
 
         # Log step: Creating the output file
         print_step(f"Creating the output file in {output_format} format...")
 
         # Generate the output file based on the requested format
         try:
-            if output_format.lower() == 'html':
-                output_file = f"{file_name or prompt}.html"
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    # Format the HTML content with the generated blog Markdown content.
-                    # IMPORTANT: Dont change the format of the HTML content. It is required for perfect rendering and indentation of the blog content.
-                    
-                    f.write(f"""<!DOCTYPE html>
-<html lang="en">
-
-   <head>
-      <meta charset="UTF-8">
-      <meta name="description" content="{description}">
-      <meta name="keywords"content="{meta_keywords}">
-      <meta name="viewport" content="width=device-width, initial-scale=1.0">
-      <title>{prompt}</title>""")
-                    f.write("""
-      <style>
-         body {
-            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif;
-         }
-      </style>""")
-                    f.write(f"""
-   </head>
-
-   <body>
-      <markdown>
-         {markdown_content}
-      </markdown>
-      <script src="https://cdn.jsdelivr.net/gh/OCEANOFANYTHINGOFFICIAL/mdonhtml.js/scripts/mdonhtml.min.js"></script>
-   </body>
-
-</html>""")
-                print_success(f"Blog content saved to: {output_file}")
-            elif output_format.lower() in ['md', 'github']:
-                try:
-                    output_file = f"{file_name or prompt}.md"
-                    with open(output_file, 'w', encoding='utf-8') as f:
-                        f.write(markdown_content)
-                    print_success(f"Blog content saved to: {output_file}")
-                except Exception as e:
-                    print_error(f"Failed to save the blog content: {e}")
+            if stream and file_name == '-':
+                # stdout can't be rewritten, so the metadata follows the streamed article instead
+                print(f"\n<!--\ndescription: {description}\nkeywords: {meta_keywords}\n-->", flush=True)
+                output_file = '-'
             else:
-                print_error(f"Invalid output format: {output_format}")
+                article = {
+                    'title': prompt,
+                    'description': description,
+                    'keywords': meta_keywords,
+                    'language': language,
+                    'markdown': markdown_content,
+                }
+                variants = await translate_variants(article) if translations else {}
+
+                # Every variant goes through the renderer in one pass
+                with metrics.stage('write') as stage:
+                    # The local images are copied next to the article and shared by its variants
+                    images = {}
+                    if f'({ASSETS_DIR}/' in markdown_content:
+                        images = link_assets(markdown_content, get_image_cache(),
+                                             os.path.join(os.path.dirname(output_path), ASSETS_DIR), ASSETS_DIR)
+                    write_article(output_path, dict(article, images=images), output_format)
+                    output_file = output_path
+                    stage['bytes'] = os.path.getsize(output_file)
+                    for other, variant in variants.items():
+                        if variant is None:
+                            variant_files[other] = None
+                            continue
+                        write_article(variant_paths[other], dict(variant, images=images), output_format)
+                        variant_files[other] = variant_paths[other]
+                        stage['bytes'] += os.path.getsize(variant_paths[other])
+                if fallbacks:
+                    print_warning(f"Used a fallback for {', '.join(fallbacks)}; the next run will try again")
+                else:
+                    checkpoint(render_stage, output_file)
+                print_success(f"Blog content saved to: {output_file}")
+                print_step(f"Peak memory of the article buffers: {format_bytes(memory.peak)}")
+                for other, path in variant_files.items():
+                    if path:
+                        if not fallbacks:
+                            checkpoint(f'{render_stage}.{other}', path)
+                        print_success(f"{other} version saved to: {path}")
+
         except Exception as e:
+            output_file = None
+            job_error = str(e)
             print_error(f"Failed to save the blog content: {e}")
+            if raise_errors:
+                raise
+        failed = [other for other, path in variant_files.items() if path is None]
+        if failed and raise_errors:
+            raise RuntimeError(f"Failed to translate the blog into {', '.join(failed)}")
     except Exception as e:
+        job_error = str(e)
         print_error(f"Failed to generate the blog: {e}")
+        if raise_errors:
+            raise
+        return None
+    finally:
+        if job_key is not None:
+            # The checkpoints stay either way; a failed article resumes from its last completed stage
+            store.finish(job_key, output_file if output_file != '-' else None,
+                         error=None if output_file else job_error or 'The article was not saved')
+        metrics.record('stage', 'article', latency=time.perf_counter() - article_start,
+                       status='ok' if output_file else 'error', peak_bytes=memory.peak)
+        current_topic.reset(topic_token)
+
+    return {language: output_file, **variant_files} if translations else output_file
+
+def generate_blog(prompt, max_words=None, min_words=None, output_format='HTML', file_name=None, language='English', raise_errors=False, stream=False, keyword_mode=None, translations=None, on_lines=None, memory=None):
+    """
+    Generate a blog article based on the provided prompt and save it to an output file.
+    Synchronous wrapper around agenerate_blog.
+    Args:
+        prompt (str): The topic or prompt for the blog article.
+        max_words (int): The maximum number of words for the blog article.
+        min_words (int): The minimum number of words for the blog article.
+        output_format (str): The output format for the blog article (HTML, Markdown, GitHub, JSON).
+        file_name (str): The name of the output file to be generated.
+        language (str): The language for the blog article (default is English).
+        raise_errors (bool): Re-raise failures instead of only logging them (used by batch mode).
+        stream (bool): Write the markdown progressively while it is generated (see agenerate_blog).
+        keyword_mode (str): 'llm', 'local' or 'hybrid' keyword extraction (see agenerate_blog).
+        translations (list): Other languages to translate the article into (see agenerate_blog).
+        on_lines (function): With stream, a callback given the cleaned lines as they are written.
+        memory (ArticleMemory): The memory budget of the article (see agenerate_blog).
+    Returns:
+        str: The path of the saved output file, or None if the blog could not be saved. With
+            translations, a dict mapping every language to its output path.
+    """
+    return asyncio.run(agenerate_blog(prompt, max_words, min_words, output_format, file_name, language, raise_errors, stream, keyword_mode, translations, on_lines, memory))
 
+def load_batch_topics(source):
+    """
+    Load the topics (and optional per-topic options) for a batch run.
+    Args:
+        source (str): Path to a JSONL or CSV file, or '-' to read JSONL/CSV from stdin.
+    Returns:
+        list: A list of dicts, each with a 'topic' key and any per-topic options
+    """
+    
+    if source == '-':
+        text = sys.stdin.read()
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            text = f.read()
+
+    # JSONL lines start with '{'; anything else is treated as CSV with a header row
+    first_line = text.lstrip().split('\n', 1)[0].strip()
+    if first_line.startswith('{'):
+        rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        rows = [dict(row) for row in csv.DictReader(text.splitlines())]
+
+    tasks = []
+    for line_number, row in enumerate(rows, start=1):
+        # Drop empty CSV cells so that the command-line defaults apply
+        row = {key.strip(): value for key, value in row.items() if key and value not in (None, '')}
+        if not row.get('topic'):
+            raise ValueError(f"Batch entry {line_number} has no topic")
+        for key in ('max_words', 'min_words'):
+            if key in row:
+                row[key] = int(row[key])
+        # CSV cells list the translation languages separated by commas or semicolons
+        if isinstance(row.get('translations'), str):
+            row['translations'] = [other.strip() for other in row['translations'].replace(';', ',').split(',') if other.strip()]
+        tasks.append(row)
+
+    return tasks
+
+async def arun_batch(tasks, workers=4, manifest_path='batch_manifest.jsonl', defaults=None):
+    """
+    Generate many blog articles concurrently on one event loop, with at most `workers` in flight.
+    All articles share the event loop's async Cohere client. A failed topic is recorded in the
+    manifest and skipped without stopping the rest of the batch.
+    Args:
+        tasks (list): Topic dicts as returned by load_batch_topics.
+        workers (int): The maximum number of articles generated at the same time.
+        manifest_path (str): Path of the JSONL manifest with one result per topic.
+        defaults (dict): Options applied to every topic that does not set them itself.
+    Returns:
+        list: The manifest entries, in the same order as the tasks
+    """
+    
+    defaults = defaults or {}
+    options = ('max_words', 'min_words', 'output_format', 'file_name', 'language', 'stream', 'keyword_mode', 'translations')
+    semaphore = asyncio.Semaphore(max(1, workers))
+
+    async def run_task(task):
+        settings = {key: task.get(key, defaults.get(key)) for key in options}
+        settings['output_format'] = settings['output_format'] or 'HTML'
+        settings['language'] = settings['language'] or 'English'
+        entry = {'topic': task['topic'], 'status': 'ok', 'output_file': None, 'error': None}
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                if not settings['max_words'] and not settings['min_words']:
+                    raise ValueError('At least one of max_words or min_words is required.')
+                if settings['file_name'] == '-':
+                    raise ValueError('Batch articles cannot be streamed to stdout.')
+                entry['output_file'] = await agenerate_blog(task['topic'], raise_errors=True, **settings)
+            except Exception as e:
+                entry['status'] = 'failed'
+                entry['error'] = str(e)
+            entry['elapsed'] = round(time.monotonic() - start, 3)
+        return entry
+
+    print_step(f"Generating {len(tasks)} blog articles with {workers} workers...")
+
+    results = [None] * len(tasks)
+    with open(manifest_path, 'w', encoding='utf-8') as manifest:
+        pending = {asyncio.ensure_future(run_task(task)): index for index, task in enumerate(tasks)}
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                entry = future.result()
+                results[pending.pop(future)] = entry
+                # Write each result as soon as it is known so a crashed run still leaves a manifest
+                manifest.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                manifest.flush()
+                if entry['status'] == 'ok':
+                    print_success(f"[{entry['topic']}] done in {entry['elapsed']}s")
+                else:
+                    print_error(f"[{entry['topic']}] failed: {entry['error']}")
+
+    # Latency percentiles of every stage and model call in the batch
+    print_step("Batch timings:")
+    for line in metrics.format_summary():
+        print(line, file=LOG_FILE)
+    articles = metrics.summary().get(('stage', 'article'))
+    if articles and articles['peak_bytes']:
+        print_step(f"Largest article buffers: {format_bytes(articles['peak_bytes'])}")
+
+    failed = sum(1 for entry in results if entry['status'] != 'ok')
+    if failed:
+        print_warning(f"Batch finished: {len(tasks) - failed} succeeded, {failed} failed. See {manifest_path}")
+    else:
+        print_success(f"Batch finished: all {len(tasks)} articles generated. See {manifest_path}")
+
+    return results
+
+def run_batch(tasks, workers=4, manifest_path='batch_manifest.jsonl', defaults=None):
+    """
+    Synchronous wrapper around arun_batch.
+    """
+    return asyncio.run(arun_batch(tasks, workers, manifest_path, defaults))
 
 def main():
     """
@@ -459,26 +1576,128 @@ def main():
     
     # Set up argument parser for command-line interface
     parser = argparse.ArgumentParser(description='AI Blog Generator')
-    parser.add_argument('topic', type=str, help='Topic of the blog')  # Required argument for blog topic
+    parser.add_argument('topic', type=str, nargs='?', help='Topic of the blog (omit when using --batch)')  # Blog topic, required unless running a batch
     parser.add_argument('-mw', '--max_words', type=int, help='Maximum number of words')  # Optional max words argument
     parser.add_argument('-mnw', '--min_words', type=int, help='Minimum number of words')  # Optional min words argument
-    parser.add_argument('-of', '--output_format', type=str, choices=['HTML', 'Markdown', 'md', 'github'], default='HTML', help='Output format (HTML, Markdown, md, GitHub)')  # Optional output format argument
+    parser.add_argument('-of', '--output_format', type=str, choices=['HTML', 'Markdown', 'md', 'github', 'json'], default='HTML', help='Output format (HTML, Markdown, md, GitHub, JSON)')  # Optional output format argument
     parser.add_argument('-fn', '--file_name', type=str, help='Output file name')  # Optional file name argument
     parser.add_argument('-l', '--language', type=str, default='English', help='Language of the article')  # Optional language argument
+    parser.add_argument('-ls', '--languages', type=str, help='Comma separated languages to publish in; the article is written in the first and translated into the rest')  # Optional locale fan-out
     parser.add_argument('-gr', '--github_readme', action='store_true', help='Convert content to GitHub README format')  # Small flag for GitHub README formatting
+    parser.add_argument('-b', '--batch', type=str, help="JSONL or CSV file with one topic per entry ('-' for stdin)")  # Optional batch input
+    parser.add_argument('-w', '--workers', type=int, default=4, help='Number of concurrent workers for --batch')  # Optional batch worker count
+    parser.add_argument('-m', '--manifest', type=str, default='batch_manifest.jsonl', help='Result manifest path for --batch')  # Optional batch manifest path
+    parser.add_argument('-s', '--stream', action='store_true', help="Write the article while it is generated (use -fn - for stdout)")  # Flag for incremental output
+    parser.add_argument('-rl', '--rate_limit', type=float, help='API quota in requests per minute, shared by all workers')  # Optional client-side rate limit
+    parser.add_argument('-ra', '--retry_attempts', type=int, help='Maximum attempts per model call (default 5)')  # Optional retry limit
+    parser.add_argument('-mx', '--metrics', type=str, help='Export stage and model call metrics (.prom for Prometheus text, JSON lines otherwise)')  # Optional metrics export
+    parser.add_argument('-nc', '--no_cache', action='store_true', help='Bypass the response cache')  # Flag to skip the response cache entirely
+    parser.add_argument('-rc', '--refresh_cache', action='store_true', help='Ignore cached responses but store the new ones')  # Flag to refresh the response cache
+    parser.add_argument('-cp', '--cache_path', type=str, help='Path of the response cache database')  # Optional cache location
+
+    parser.add_argument('-cb', '--context_budget', type=int, help='Token budget of the article context sent for the description and keywords (0 for the whole article)')  # Optional enrichment prompt budget
+    parser.add_argument('-mm', '--max_memory', type=float, help='Memory ceiling of the text buffers of one article, in MB (0 for none)')  # Optional per-article memory ceiling
+    parser.add_argument('-km', '--keyword_mode', type=str, choices=KEYWORD_MODES, help='How keywords and image topics are found: llm, local or hybrid (default llm)')  # Optional keyword extraction mode
+    parser.add_argument('-kc', '--keyword_corpus', type=str, help='Path of the corpus database used by local keyword extraction')  # Optional keyword corpus location
+    parser.add_argument('-rs', '--restart', action='store_true', help='Ignore saved checkpoints and generate every article from scratch')  # Flag to start over
+    parser.add_argument('-nj', '--no_jobs', action='store_true', help='Do not checkpoint or resume articles')  # Flag to skip the job store
+    parser.add_argument('-jp', '--jobs_path', type=str, help='Path of the job checkpoint database')  # Optional job store location
+    parser.add_argument('-ip', '--image_provider', type=str, help="Image source: loremflickr (default), link to hot-link without downloading, or an image directory")  # Optional image provider
+    parser.add_argument('-ic', '--image_cache', type=str, help='Directory of the image cache')  # Optional image cache path
+    parser.add_argument('-k', '--api_key', type=str, help='Cohere API key (defaults to the CO_API_KEY environment variable)')  # Optional API key
 
     args = parser.parse_args()
 
-    # Ensure that at least one of max_words or min_words is provided
-    if not args.max_words and not args.min_words:
-        parser.error('At least one of --max_words or --min_words is required.')
+    # Initialize colorama; only the command line needs it
+    init(autoreset=True)
+
+    configure_client(args.api_key)
+
+    if args.no_cache and args.refresh_cache:
+        parser.error('--no_cache and --refresh_cache cannot be used together.')
+
+    if args.rate_limit is not None and args.rate_limit <= 0:
+        parser.error('--rate_limit must be positive.')
+    if args.retry_attempts is not None and args.retry_attempts < 1:
+        parser.error('--retry_attempts must be at least 1.')
+    configure_rate_limit(args.rate_limit, args.retry_attempts)
+
+    if args.context_budget is not None and args.context_budget < 0:
+        parser.error('--context_budget cannot be negative.')
+    configure_context_budget(args.context_budget)
+    if args.max_memory is not None and args.max_memory < 0:
+        parser.error('--max_memory cannot be negative.')
+    configure_memory(args.max_memory)
+    configure_keywords(args.keyword_mode, args.keyword_corpus)
+    try:
+        configure_images(args.image_provider, args.image_cache)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.restart and args.no_jobs:
+        parser.error('--restart and --no_jobs cannot be used together.')
+    # Set up the checkpoints used to resume failed or interrupted articles
+    configure_jobs('off' if args.no_jobs else 'restart' if args.restart else 'resume', args.jobs_path)
+
+    # Set up the response cache used by every model call
+    configure_cache('off' if args.no_cache else 'refresh' if args.refresh_cache else 'use', args.cache_path)
+
+    # The first language is the one the article is written in, the rest are translated from it
+    translations = None
+    if args.languages:
+        languages = [other.strip() for other in args.languages.split(',') if other.strip()]
+        if not languages:
+            parser.error('--languages needs at least one language.')
+        args.language, translations = languages[0], languages[1:]
+        if translations and args.file_name == '-':
+            parser.error('Translated variants cannot be streamed to stdout (-fn -).')
 
     # Check if the GitHub README formatting flag is set
     if args.github_readme:
         args.output_format = 'github'
 
+    if args.file_name == '-':
+        if not args.stream:
+            parser.error('Writing to stdout (-fn -) requires --stream.')
+        # Keep progress messages out of the streamed article
+        global LOG_FILE
+        LOG_FILE = sys.stderr
+
+    if args.batch:
+        if args.topic:
+            parser.error('A topic cannot be combined with --batch.')
+        if args.workers < 1:
+            parser.error('--workers must be at least 1.')
+        try:
+            tasks = load_batch_topics(args.batch)
+        except (OSError, ValueError) as e:
+            parser.error(f'Could not read the batch file: {e}')
+
+        # Command-line options act as defaults for topics that don't set their own
+        defaults = {
+            'max_words': args.max_words,
+            'min_words': args.min_words,
+            'output_format': args.output_format,
+            'language': args.language,
+            'stream': args.stream,
+            'translations': translations,
+        }
+        results = run_batch(tasks, args.workers, args.manifest, defaults)
+        if args.metrics:
+            metrics.export(args.metrics)
+        sys.exit(1 if any(entry['status'] != 'ok' for entry in results) else 0)
+
+    if not args.topic:
+        parser.error('A topic is required unless --batch is given.')
+
+    # Ensure that at least one of max_words or min_words is provided
+    if not args.max_words and not args.min_words:
+        parser.error('At least one of --max_words or --min_words is required.')
+
     # Generate the blog based on parsed arguments
-    generate_blog(args.topic, args.max_words, args.min_words, args.output_format, args.file_name, args.language)
+    generate_blog(args.topic, args.max_words, args.min_words, args.output_format, args.file_name, args.language, stream=args.stream, translations=translations)
+    if args.metrics:
+        metrics.export(args.metrics)
 
 if __name__ == '__main__':
     main()
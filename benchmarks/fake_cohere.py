@@ -0,0 +1,197 @@
+# Fake Cohere Server
+# Description: A localhost stand-in for the Cohere chat-stream and generate endpoints, for offline benchmarks.
+# Usage: python benchmarks/fake_cohere.py [--port N] [--latency S] [--token_rate N] [--error_rate P] [--rate_limit_rate P]
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from normalizer_benchmark import synthetic_article
+
+class FakeCohereServer:
+    """
+    Serves /v1/chat (streamed) and /v1/generate with configurable latency, token rate, server
+    errors and 429 rate limits, so the real SDK and HTTP stack are exercised without an API key.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.05, token_rate=500.0, error_rate=0.0,
+                 rate_limit_rate=0.0, retry_after=1.0, article_sections=40, seed=None):
+        """
+        Args:
+            host (str): The interface to listen on.
+            port (int): The port to listen on (0 picks a free one).
+            latency (float): Seconds before the first byte of every response.
+            token_rate (float): Generated tokens per second, per request.
+            error_rate (float): Fraction of requests answered with a 503.
+            rate_limit_rate (float): Fraction of requests answered with a 429 and a Retry-After header.
+            retry_after (float): The Retry-After value sent with 429 responses, in seconds.
+            article_sections (int): Size of the streamed articles, in sections.
+            seed (int): Seed for the injected failures.
+        """
+        self.latency = latency
+        self.token_rate = token_rate
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.article_tokens = synthetic_article(article_sections).split(' ')
+        self.random = random.Random(seed)
+        self.requests = {'chat': 0, 'generate': 0, 'errors': 0, 'rate_limited': 0}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        The base URL to give the Cohere client.
+        """
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """
+        Serve requests on a background thread.
+        """
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close the socket.
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _injected_failure(self):
+        with self._lock:
+            roll = self.random.random()
+            if roll < self.rate_limit_rate:
+                self.requests['rate_limited'] += 1
+                return 429
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.requests['errors'] += 1
+                return 503
+        return None
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                time.sleep(server.latency)
+                failure = server._injected_failure()
+                if failure is not None:
+                    headers = {'Retry-After': str(server.retry_after)} if failure == 429 else {}
+                    return self._send_json(failure, {'message': 'injected failure'}, headers)
+                if self.path.rstrip('/').endswith('/v1/chat'):
+                    try:
+                        return self._chat(body)
+                    except (BrokenPipeError, ConnectionResetError):
+                        # The client stopped reading the stream, e.g. over its memory ceiling
+                        self.close_connection = True
+                        return
+                if self.path.rstrip('/').endswith('/v1/generate'):
+                    return self._generate(body)
+                self._send_json(404, {'message': f'unknown endpoint {self.path}'})
+
+            def _send_json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _chunk(self, event):
+                data = (json.dumps(event) + '\n').encode('utf-8')
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+                self.wfile.flush()
+
+            def _chat(self, body):
+                with server._lock:
+                    server.requests['chat'] += 1
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/stream+json')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                generation_id = str(uuid.uuid4())
+                self._chunk({'is_finished': False, 'event_type': 'stream-start', 'generation_id': generation_id})
+                tokens = server.article_tokens
+                # Send tokens in groups of 20 to keep the pacing cheap
+                for start in range(0, len(tokens), 20):
+                    group = tokens[start:start + 20]
+                    time.sleep(len(group) / server.token_rate)
+                    text = ' '.join(group) + (' ' if start + 20 < len(tokens) else '')
+                    self._chunk({'is_finished': False, 'event_type': 'text-generation', 'text': text})
+                self._chunk({
+                    'is_finished': True,
+                    'event_type': 'stream-end',
+                    'finish_reason': 'COMPLETE',
+                    'response': {
+                        'text': '',
+                        'generation_id': generation_id,
+                        'finish_reason': 'COMPLETE',
+                        'meta': {'billed_units': {
+                            'input_tokens': len(body.get('message', '').split()),
+                            'output_tokens': len(tokens),
+                        }},
+                    },
+                })
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _generate(self, body):
+                with server._lock:
+                    server.requests['generate'] += 1
+                output_tokens = min(body.get('max_tokens') or 50, 50)
+                time.sleep(output_tokens / server.token_rate)
+                words = [token for token in server.article_tokens[:output_tokens * 2] if token.isalpha()]
+                self._send_json(200, {
+                    'id': str(uuid.uuid4()),
+                    'prompt': body.get('prompt'),
+                    'generations': [{'id': str(uuid.uuid4()), 'text': ', '.join(words[:output_tokens // 5 or 1])}],
+                    'meta': {'billed_units': {
+                        'input_tokens': len(body.get('prompt', '').split()),
+                        'output_tokens': output_tokens,
+                    }},
+                })
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Cohere API server for offline benchmarks')
+    parser.add_argument('--port', type=int, default=8787, help='Port to listen on')
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds before the first byte of every response')
+    parser.add_argument('--token_rate', type=float, default=500.0, help='Generated tokens per second')
+    parser.add_argument('--error_rate', type=float, default=0.0, help='Fraction of requests failing with 503')
+    parser.add_argument('--rate_limit_rate', type=float, default=0.0, help='Fraction of requests failing with 429')
+    parser.add_argument('--retry_after', type=float, default=1.0, help='Retry-After sent with 429 responses')
+    args = parser.parse_args()
+
+    server = FakeCohereServer(port=args.port, latency=args.latency, token_rate=args.token_rate, error_rate=args.error_rate,
+                              rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after)
+    print(f"Fake Cohere API listening on {server.url} (set CO_API_URL to use it)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == '__main__':
+    main()
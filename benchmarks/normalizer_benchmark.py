@@ -0,0 +1,84 @@
+# Normalizer Benchmark
+# Description: Compare the single-pass MarkdownNormalizer with the original chained str.replace cleanup.
+# Usage: python benchmarks/normalizer_benchmark.py [--sections N] [--repeat N]
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from markdown_normalizer import MarkdownNormalizer
+
+IMAGE_URL = "https://loremflickr.com/800/600/benchmark"
+
+def legacy_normalize(blog_content, prompt):
+    """
+    The cleanup generate_blog() used before the normalizer: six full-text replace passes,
+    a heading loop and an image insertion loop.
+    """
+    blog_content = blog_content.replace("## Outline:", "").strip()
+    blog_content = blog_content.replace("## Article:", "").strip()
+    blog_content = blog_content.replace("#### H4:", "####")
+    blog_content = blog_content.replace("### H3:", "###")
+    blog_content = blog_content.replace("## H2:", "##")
+    blog_content = blog_content.replace("# H1:", "#")
+
+    if not blog_content.startswith("# "):
+        blog_content = f"# {prompt}\n\n" + blog_content
+
+    lines = blog_content.split('\n')
+    for i in range(len(lines)):
+        if lines[i].startswith('#'):
+            lines[i] = lines[i].rstrip(':')
+
+    for i, line in enumerate(lines):
+        if line.startswith('# '):
+            lines[i] = f'{line}\n![Image]({IMAGE_URL})'
+
+    return '\n'.join(lines)
+
+def new_normalize(blog_content, prompt):
+    """
+    The same cleanup with MarkdownNormalizer and an image hook.
+    """
+    normalizer = MarkdownNormalizer(prompt, image_hook=lambda title: f'![Image]({IMAGE_URL})')
+    return '\n'.join(normalizer.normalize(blog_content))
+
+def synthetic_article(sections, seed=0):
+    """
+    Build a model-like article with the prefixes and markers the cleanup has to handle.
+    """
+    rng = random.Random(seed)
+    words = "the quick brown fox jumps over a lazy dog while search engines index every page".split()
+    parts = ["## Outline:", "# H1: Benchmark Article:", "", "## Article:"]
+    for section in range(sections):
+        parts.append(f"# H1: Section {section}:" if section % 4 == 0 else f"## H2: Part {section}:")
+        for _ in range(3):
+            parts.append(' '.join(rng.choice(words) for _ in range(40)))
+            parts.append("")
+        parts.append(f"### H3: Detail {section}:")
+        parts.append(' '.join(rng.choice(words) for _ in range(25)))
+        parts.append("")
+    return '\n'.join(parts)
+
+def main():
+    parser = argparse.ArgumentParser(description='Markdown normalizer micro-benchmark')
+    parser.add_argument('--sections', type=int, nargs='+', default=[20, 200, 2000], help='Article sizes in sections')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions (best is reported)')
+    args = parser.parse_args()
+
+    print(f"{'sections':>10} {'size (KB)':>10} {'legacy (ms)':>12} {'normalizer (ms)':>16} {'speedup':>8}")
+    for sections in args.sections:
+        article = synthetic_article(sections)
+        if legacy_normalize(article, 'Benchmark') != new_normalize(article, 'Benchmark'):
+            sys.exit(f"Outputs differ for {sections} sections")
+        number = max(1, 2000 // sections)
+        legacy = min(timeit.repeat(lambda: legacy_normalize(article, 'Benchmark'), number=number, repeat=args.repeat)) / number
+        new = min(timeit.repeat(lambda: new_normalize(article, 'Benchmark'), number=number, repeat=args.repeat)) / number
+        print(f"{sections:>10} {len(article) / 1024:>10.1f} {legacy * 1000:>12.3f} {new * 1000:>16.3f} {legacy / new:>7.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+# Pipeline Benchmark
+# Description: Measure generate_blog() throughput offline, against the local fake Cohere server, in single, batch and concurrent modes.
+# Usage: python benchmarks/pipeline_benchmark.py [--articles N] [--workers N] [--latency S] [--token_rate N] [--error_rate P] [--rate_limit_rate P]
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from fake_cohere import FakeCohereServer
+
+MODES = ('single', 'batch', 'concurrent')
+
+# Stages shown in the results table, in pipeline order
+REPORTED_STAGES = ('generate', 'image', 'enrich.markdown', 'enrich.keywords', 'enrich.description', 'write', 'article')
+
+def write_images(directory, names=('page', 'index', 'search', 'engines', 'dog', 'fox')):
+    """
+    Write small solid-colour PNGs, named after words of the fake articles, for the directory image provider.
+    """
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    width, height = 80, 60
+    for index, name in enumerate(names):
+        row = b'\x00' + bytes((index * 40 % 256, 120, 200)) * width
+        png = b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        png += chunk(b'IDAT', zlib.compress(row * height)) + chunk(b'IEND', b'')
+        with open(os.path.join(directory, f"{name}.png"), 'wb') as f:
+            f.write(png)
+
+def run_mode(mode, articles, workers, output_format, keyword_mode):
+    """
+    Generate the articles in one mode. Runs in a child process, so that every mode starts from
+    a fresh interpreter and its peak RSS is its own.
+    Returns:
+        dict: Counts, elapsed time, peak RSS, the largest article buffers and per-stage latency percentiles
+    """
+    sys.path.insert(0, REPO_ROOT)
+    import aibag
+
+    aibag.configure_cache('off')
+    aibag.configure_keywords(keyword_mode)
+    aibag.LOG_FILE = open(os.devnull, 'w')
+    aibag.metrics.reset()
+    topics = [f"Benchmark topic {index}" for index in range(articles)]
+    options = {'max_words': 800, 'output_format': output_format}
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Images come from a local directory, so the benchmark stays offline
+        image_dir = os.path.join(work_dir, 'images')
+        os.makedirs(image_dir)
+        write_images(image_dir)
+        aibag.configure_images(image_dir, os.path.join(work_dir, 'image_cache'))
+        os.chdir(work_dir)
+        start = time.perf_counter()
+        if mode == 'single':
+            outputs = [aibag.generate_blog(topic, **options) for topic in topics]
+        elif mode == 'batch':
+            results = aibag.run_batch([{'topic': topic} for topic in topics], workers=workers, defaults=options)
+            outputs = [entry['output_file'] for entry in results]
+        else:
+            async def generate_all():
+                return await asyncio.gather(
+                    *(aibag.agenerate_blog(topic, **options) for topic in topics), return_exceptions=True
+                )
+            outputs = [output if isinstance(output, str) else None for output in asyncio.run(generate_all())]
+        elapsed = time.perf_counter() - start
+        os.chdir(REPO_ROOT)
+
+    summary = aibag.metrics.summary()
+    stages = {name: {'p50': values['p50'], 'p95': values['p95']}
+              for (kind, name), values in summary.items() if kind == 'stage'}
+    model_retries = sum(values['retries'] for (kind, _), values in summary.items() if kind == 'model_call')
+    completed = sum(1 for output in outputs if output)
+    articles = summary.get(('stage', 'article'), {})
+    return {
+        'mode': mode,
+        'articles': completed,
+        'failed': len(topics) - completed,
+        'elapsed': elapsed,
+        'articles_per_minute': completed / elapsed * 60 if elapsed else 0.0,
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'retries': model_retries,
+        # Largest total of the text buffers held by one article
+        'peak_article_kb': articles.get('peak_bytes', 0) / 1024,
+        'stages': stages,
+    }
+
+def spawn_mode(mode, args, base_url):
+    """
+    Run one mode in a child process pointed at the fake server and return its result.
+    """
+    env = dict(os.environ, CO_API_URL=base_url, CO_API_KEY='benchmark')
+    command = [
+        sys.executable, os.path.abspath(__file__), '--child', mode,
+        '--articles', str(args.articles), '--workers', str(args.workers), '--output_format', args.output_format,
+        '--keyword_mode', args.keyword_mode,
+    ]
+    completed = subprocess.run(command, env=env, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline generate_blog() throughput benchmark')
+    parser.add_argument('--articles', type=int, default=8, help='Articles generated in each mode')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent articles in batch mode')
+    parser.add_argument('--modes', default=','.join(MODES), help='Comma separated modes to run (single, batch, concurrent)')
+    parser.add_argument('--output_format', default='HTML', help='Output format of the generated articles')
+    parser.add_argument('--keyword_mode', default='llm', help='Keyword extraction mode of the generated articles (llm, local, hybrid)')
+    parser.add_argument('--latency', type=float, default=0.05, help='Fake server latency before each response, in seconds')
+    parser.add_argument('--token_rate', type=float, default=2000.0, help='Fake server generated tokens per second')
+    parser.add_argument('--error_rate', type=float, default=0.0, help='Fraction of fake server responses failing with 503')
+    parser.add_argument('--rate_limit_rate', type=float, default=0.0, help='Fraction of fake server responses failing with 429')
+    parser.add_argument('--sections', type=int, default=40, help='Sections in each fake article')
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.child, args.articles, args.workers, args.output_format, args.keyword_mode)))
+        return
+
+    server = FakeCohereServer(latency=args.latency, token_rate=args.token_rate, error_rate=args.error_rate,
+                              rate_limit_rate=args.rate_limit_rate, retry_after=0.1, article_sections=args.sections,
+                              seed=0).start()
+    try:
+        results = [spawn_mode(mode.strip(), args, server.url) for mode in args.modes.split(',') if mode.strip()]
+    finally:
+        server.stop()
+
+    print(f"{args.articles} articles per mode, {args.workers} batch workers, fake server at {server.url}")
+    print(f"{'mode':<11} {'ok':>4} {'failed':>7} {'elapsed (s)':>12} {'articles/min':>13} {'peak RSS (MB)':>14} {'article (KB)':>13} {'retries':>8}")
+    for result in results:
+        print(
+            f"{result['mode']:<11} {result['articles']:>4} {result['failed']:>7} {result['elapsed']:>12.2f} "
+            f"{result['articles_per_minute']:>13.1f} {result['peak_rss_mb']:>14.1f} {result['peak_article_kb']:>13.1f} {result['retries']:>8}"
+        )
+
+    print()
+    print(f"{'stage':<20} " + ' '.join(f"{mode + ' p50/p95 (s)':>24}" for mode in (result['mode'] for result in results)))
+    for stage in REPORTED_STAGES:
+        cells = []
+        for result in results:
+            values = result['stages'].get(stage)
+            cells.append(f"{values['p50']:>11.3f} / {values['p95']:>10.3f}" if values else f"{'-':>24}")
+        print(f"{stage:<20} " + ' '.join(cells))
+    print(f"\nFake server requests: {server.requests}")
+
+if __name__ == '__main__':
+    main()
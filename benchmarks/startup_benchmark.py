@@ -0,0 +1,74 @@
+# Startup Benchmark
+# Description: Check the import time of aibag.py against a budget with python -X importtime, and that the Cohere SDK stays unloaded.
+# Usage: python benchmarks/startup_benchmark.py [--budget_ms N] [--repeat N]
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported once a model call needs a client
+DEFERRED_MODULES = ('cohere', 'httpx', 'pydantic')
+
+def import_profile():
+    """
+    Import aibag in a fresh interpreter with -X importtime.
+    Returns:
+        tuple: (cumulative import time of aibag in milliseconds, {module: cumulative microseconds})
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import aibag'],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    modules = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative)
+    return modules['aibag'] / 1000, modules
+
+def help_time():
+    """
+    Wall time of `python aibag.py --help`, in milliseconds.
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable, 'aibag.py', '--help'], cwd=REPO_ROOT, capture_output=True, check=True)
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='aibag.py startup budget check')
+    parser.add_argument('--budget_ms', type=float, default=150.0, help='Allowed median import time of aibag, in milliseconds')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of fresh interpreters to measure')
+    args = parser.parse_args()
+
+    import_times = []
+    loaded = set()
+    for _ in range(args.repeat):
+        import_ms, modules = import_profile()
+        import_times.append(import_ms)
+        loaded.update(name.split('.')[0] for name in modules if name.split('.')[0] in DEFERRED_MODULES)
+    help_times = [help_time() for _ in range(args.repeat)]
+
+    import_median = statistics.median(import_times)
+    print(f"{'measurement':<24} {'median (ms)':>12} {'min (ms)':>10} {'max (ms)':>10}")
+    print(f"{'import aibag':<24} {import_median:>12.1f} {min(import_times):>10.1f} {max(import_times):>10.1f}")
+    print(f"{'aibag.py --help':<24} {statistics.median(help_times):>12.1f} {min(help_times):>10.1f} {max(help_times):>10.1f}")
+
+    failures = []
+    if import_median > args.budget_ms:
+        failures.append(f"import aibag took {import_median:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    if loaded:
+        failures.append(f"modules that should be deferred were imported: {', '.join(sorted(loaded))}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print(f"OK: within the {args.budget_ms:.0f} ms budget, Cohere SDK not loaded at import")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+# Context Budget
+# Description: Compact article context and chunking under a token budget, for the enrichment prompts of aibag.py.
+# Author: Nakshatra Ranjan Saha
+
+import math
+import re
+
+from keyword_extraction import STOPWORDS, tokenize
+
+# Rough size of a token in characters, for English prose; close enough for budgeting without a tokenizer
+CHARS_PER_TOKEN = 4
+
+_IMAGE_LINE = re.compile(r"^\s*!\[[^\]]*\]\([^)]*\)\s*$")
+
+def estimate_tokens(text):
+    """
+    Estimate the number of tokens in a text.
+    Args:
+        text (str): The text.
+    Returns:
+        int: The estimated token count
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def fit_to_budget(text, max_tokens):
+    """
+    Cut a text down to a token budget at a word boundary.
+    Args:
+        text (str): The text.
+        max_tokens (int): The budget.
+    Returns:
+        str: The text, shortened and ending in '...' if it did not fit
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max(0, max_chars - 3)]
+    if ' ' in cut:
+        cut = cut[:cut.rindex(' ')]
+    return cut.rstrip(' ,;:') + '...' if cut else ''
+
+def split_sections(lines):
+    """
+    Group markdown lines into sections, each starting at a heading.
+    Args:
+        lines (list): The article lines.
+    Returns:
+        list: (heading, paragraphs) pairs; heading is None for text before the first heading,
+            and image lines are left out of the paragraphs
+    """
+    sections = []
+    heading = None
+    paragraphs = []
+    paragraph = []
+    for line in lines:
+        if line.startswith('#'):
+            if paragraph:
+                paragraphs.append(' '.join(paragraph))
+            if heading is not None or paragraphs:
+                sections.append((heading, paragraphs))
+            heading, paragraphs, paragraph = line, [], []
+        elif not line.strip() or _IMAGE_LINE.match(line):
+            if paragraph:
+                paragraphs.append(' '.join(paragraph))
+                paragraph = []
+        else:
+            paragraph.append(line.strip())
+    if paragraph:
+        paragraphs.append(' '.join(paragraph))
+    if heading is not None or paragraphs:
+        sections.append((heading, paragraphs))
+    return sections
+
+def key_terms(text, limit=15):
+    """
+    Pick the most frequent non-stopword terms of a text.
+    Args:
+        text (str): The text.
+        limit (int): The maximum number of terms.
+    Returns:
+        list: The terms, most frequent first
+    """
+    counts = {}
+    for word in tokenize(text):
+        if len(word) > 2 and word not in STOPWORDS:
+            counts[word] = counts.get(word, 0) + 1
+    # Ties keep the order of first appearance
+    return sorted(counts, key=counts.get, reverse=True)[:limit]
+
+def build_context(lines, title, max_tokens):
+    """
+    Build a compact representation of an article for enrichment prompts: the title, the
+    headings outline, key terms and as many lead paragraphs as fit in the budget.
+    Args:
+        lines (list): The cleaned article lines.
+        title (str): The article title.
+        max_tokens (int): The token budget (0 or None sends the whole article).
+    Returns:
+        str: The article itself if it fits in the budget, otherwise its compact context
+    """
+    text = '\n'.join(line for line in lines if not _IMAGE_LINE.match(line))
+    if not max_tokens or estimate_tokens(text) <= max_tokens:
+        return text
+
+    sections = split_sections(lines)
+    header = f"Title: {title}"
+    terms = f"Key terms: {', '.join(key_terms(text))}"
+    remaining = max_tokens - estimate_tokens(header) - estimate_tokens(terms) - 8
+
+    # The outline gets up to half of the remaining budget, the lead paragraphs the rest
+    outline_budget = remaining // 2
+    outline_lines = []
+    for heading, _ in sections:
+        if not heading:
+            continue
+        entry = '  ' * (len(heading) - len(heading.lstrip('#')) - 1) + '- ' + heading.lstrip('#').strip()
+        if estimate_tokens(entry) + 1 > outline_budget:
+            break
+        outline_lines.append(entry)
+        outline_budget -= estimate_tokens(entry) + 1
+    outline = '\n'.join(outline_lines)
+    remaining -= estimate_tokens(outline)
+
+    leads = []
+    for heading, paragraphs in sections:
+        if remaining <= 0:
+            break
+        if not paragraphs:
+            continue
+        lead = fit_to_budget(paragraphs[0], min(remaining, 120))
+        if lead:
+            leads.append(lead)
+            remaining -= estimate_tokens(lead) + 1
+
+    parts = [header, f"Outline:\n{outline}" if outline else '', terms, "Lead paragraphs:\n" + '\n'.join(leads) if leads else '']
+    return '\n\n'.join(part for part in parts if part)
+
+def chunk_markdown(text, max_tokens):
+    """
+    Split markdown into chunks of at most max_tokens, breaking at headings first, then at
+    blank lines, then at line ends. A single line longer than the budget is kept whole.
+    Args:
+        text (str): The markdown.
+        max_tokens (int): The chunk budget (0 or None keeps the text in one chunk).
+    Returns:
+        list: The chunks, each starting at a line break of the text. Callers convert the chunks
+            separately, strip them and join the results with '\\n\\n', so every chunk starts a new
+            block; the unconverted chunks give back the text exactly when joined with '\\n'.
+    """
+    if not max_tokens or estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    def split(block, separators):
+        if estimate_tokens(block) <= max_tokens or not separators:
+            return [block]
+        pieces = separators[0].split(block)
+        parts = []
+        for piece in pieces:
+            parts.extend(split(piece, separators[1:]) if estimate_tokens(piece) > max_tokens else [piece])
+        return parts
+
+    # Break before headings, then before blank-line separated paragraphs, then at any line
+    separators = [re.compile(r"\n(?=#)"), re.compile(r"\n(?=\n)"), re.compile(r"\n")]
+    chunks = []
+    current = None
+    for part in split(text, separators):
+        if current is not None and estimate_tokens(current) + estimate_tokens(part) + 1 <= max_tokens:
+            current += '\n' + part
+        else:
+            if current is not None:
+                chunks.append(current)
+            current = part
+    chunks.append(current)
+    return chunks
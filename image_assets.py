@@ -0,0 +1,333 @@
+# Image Assets
+# Description: Image providers, validation and a local image cache, so the articles of aibag.py link stable local assets instead of random remote images.
+# Author: Nakshatra Ranjan Saha
+
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import struct
+import threading
+import time
+import weakref
+
+from keyword_extraction import tokenize
+
+# Largest image accepted from a provider
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+# File extensions of the image formats image_size() understands
+IMAGE_EXTENSIONS = {'png': 'png', 'jpg': 'jpeg', 'jpeg': 'jpeg', 'gif': 'gif', 'webp': 'webp'}
+
+# A markdown image: ![alt](src)
+_MARKDOWN_IMAGE = re.compile(r"!\[([^\]]*)\]\(([^)\s]+)\)")
+
+def image_size(data):
+    """
+    Read the format and dimensions of an image from its header, without decoding it.
+    Args:
+        data (bytes): The image file content.
+    Returns:
+        tuple: (format, width, height), format being 'png', 'jpeg', 'gif' or 'webp'
+    """
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and data[12:16] == b'IHDR' and len(data) >= 24:
+        width, height = struct.unpack('>II', data[16:24])
+        return _validated('png', width, height)
+    if data[:6] in (b'GIF87a', b'GIF89a') and len(data) >= 10:
+        width, height = struct.unpack('<HH', data[6:10])
+        return _validated('gif', width, height)
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        chunk = data[12:16]
+        if chunk == b'VP8 ' and len(data) >= 30:
+            width, height = struct.unpack('<HH', data[26:30])
+            return _validated('webp', width & 0x3fff, height & 0x3fff)
+        if chunk == b'VP8L' and len(data) >= 25:
+            bits = int.from_bytes(data[21:25], 'little')
+            return _validated('webp', (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1)
+        if chunk == b'VP8X' and len(data) >= 30:
+            width = int.from_bytes(data[24:27], 'little') + 1
+            height = int.from_bytes(data[27:30], 'little') + 1
+            return _validated('webp', width, height)
+    if data[:2] == b'\xff\xd8':
+        # Walk the JPEG segments up to the start-of-frame marker, which holds the dimensions
+        offset = 2
+        while offset + 9 < len(data):
+            if data[offset] != 0xff:
+                break
+            marker = data[offset + 1]
+            if marker == 0xff:
+                offset += 1
+                continue
+            length = struct.unpack('>H', data[offset + 2:offset + 4])[0]
+            if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+                height, width = struct.unpack('>HH', data[offset + 5:offset + 9])
+                return _validated('jpeg', width, height)
+            offset += 2 + length
+    raise ValueError('not a PNG, JPEG, GIF or WebP image')
+
+def _validated(image_format, width, height):
+    if width <= 0 or height <= 0:
+        raise ValueError(f"invalid {image_format} dimensions {width}x{height}")
+    return image_format, width, height
+
+class DirectoryImageProvider:
+    """
+    Serve images from a local directory, picking the file whose name shares the most words with
+    the keyword (e.g. 'solar-panels.jpg' for 'solar panel installation'). Keywords matching no
+    file still get one, chosen by a hash of the keyword, so every build picks the same image.
+    """
+
+    def __init__(self, directory):
+        """
+        Index the images of a directory (and its subdirectories).
+        Args:
+            directory (str): The image directory.
+        """
+        self.name = f"dir:{os.path.abspath(directory)}"
+        self.files = []
+        for root, _, names in os.walk(directory):
+            for name in names:
+                stem, _, extension = name.rpartition('.')
+                if extension.lower() in IMAGE_EXTENSIONS:
+                    self.files.append((os.path.join(root, name), set(tokenize(stem.replace('_', ' ')))))
+        self.files.sort()
+        if not self.files:
+            raise ValueError(f"No images found in {directory}")
+
+    async def fetch(self, keyword):
+        """
+        Get the image for a keyword.
+        Args:
+            keyword (str): The image keyword.
+        Returns:
+            bytes: The image file content
+        """
+        words = set(tokenize(keyword))
+        best = max(self.files, key=lambda entry: len(words & entry[1]))
+        if not words & best[1]:
+            digest = hashlib.sha256(keyword.encode('utf-8')).digest()
+            best = self.files[int.from_bytes(digest[:4], 'big') % len(self.files)]
+        return await asyncio.to_thread(_read_file, best[0])
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read(MAX_IMAGE_BYTES + 1)
+
+class LoremFlickrProvider:
+    """
+    Download images from loremflickr.com. The lock parameter is derived from the keyword, so the
+    same keyword gives the same photo on every build.
+    """
+
+    def __init__(self, width=800, height=600, timeout=20):
+        """
+        Args:
+            width (int): The requested image width.
+            height (int): The requested image height.
+            timeout (float): Seconds to wait for an image.
+        """
+        self.name = f"loremflickr:{width}x{height}"
+        self.width = width
+        self.height = height
+        self.timeout = timeout
+        # One HTTP client per event loop, as its connection pool is bound to the loop
+        self._clients = weakref.WeakKeyDictionary()
+
+    def url(self, keyword):
+        """
+        Build the image URL of a keyword.
+        Args:
+            keyword (str): The image keyword.
+        Returns:
+            str: The loremflickr.com URL, using up to three words of the keyword as tags
+        """
+        tags = ','.join(keyword.split()[:3]) or 'default'
+        lock = int.from_bytes(hashlib.sha256(keyword.encode('utf-8')).digest()[:2], 'big')
+        return f"https://loremflickr.com/{self.width}/{self.height}/{tags}?lock={lock}"
+
+    async def fetch(self, keyword):
+        """
+        Download the image for a keyword.
+        Args:
+            keyword (str): The image keyword.
+        Returns:
+            bytes: The image file content
+        """
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            import httpx
+
+            client = self._clients[loop] = httpx.AsyncClient(timeout=self.timeout, follow_redirects=True)
+        # The body is streamed, so an oversized image is dropped before it is downloaded in full
+        async with client.stream('GET', self.url(keyword)) as response:
+            response.raise_for_status()
+            if not response.headers.get('content-type', '').startswith('image/'):
+                raise ValueError(f"unexpected content type {response.headers.get('content-type')!r}")
+            length = response.headers.get('content-length', '')
+            if length.isdigit() and int(length) > MAX_IMAGE_BYTES:
+                raise ValueError(f"image larger than {MAX_IMAGE_BYTES} bytes")
+            data = bytearray()
+            async for chunk in response.aiter_bytes():
+                data += chunk
+                if len(data) > MAX_IMAGE_BYTES:
+                    raise ValueError(f"image larger than {MAX_IMAGE_BYTES} bytes")
+        return bytes(data)
+
+# Provider name -> function creating the provider; any other name is read as an image directory
+IMAGE_PROVIDERS = {
+    'loremflickr': LoremFlickrProvider,
+}
+
+def register_image_provider(name, factory):
+    """
+    Add (or replace) an image provider.
+    Args:
+        name (str): The provider name used with --image_provider.
+        factory (function): A function returning the provider, an object with a `name` attribute and
+            an async `fetch(keyword)` method returning the image bytes.
+    """
+    IMAGE_PROVIDERS[name.lower()] = factory
+
+def create_image_provider(name):
+    """
+    Create the image provider for a name.
+    Args:
+        name (str): A registered provider name, or the path of an image directory.
+    Returns:
+        The image provider
+    """
+    factory = IMAGE_PROVIDERS.get(name.lower())
+    if factory is not None:
+        return factory()
+    if os.path.isdir(name):
+        return DirectoryImageProvider(name)
+    raise ValueError(f"Invalid image provider: {name} (not a provider name or an image directory)")
+
+class ImageCache:
+    """
+    A local cache of validated images, keyed by provider and keyword. The files are named by a hash
+    of their content, so identical images are stored once and always get the same asset name.
+    """
+
+    def __init__(self, directory):
+        """
+        Open (or create) the cache.
+        Args:
+            directory (str): The cache directory, holding the images and their SQLite index.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, 'index.sqlite3'), check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS images ('
+            'provider TEXT NOT NULL, keyword TEXT NOT NULL, file TEXT NOT NULL, '
+            'width INTEGER NOT NULL, height INTEGER NOT NULL, created REAL NOT NULL, '
+            'PRIMARY KEY (provider, keyword))'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS images_file ON images (file)')
+        self._db.commit()
+
+    def get(self, provider, keyword):
+        """
+        Look up the cached image of a keyword.
+        Args:
+            provider (str): The provider name.
+            keyword (str): The image keyword.
+        Returns:
+            tuple: (file name, width, height), or None if the image isn't cached
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT file, width, height FROM images WHERE provider = ? AND keyword = ?', (provider, keyword)
+            ).fetchone()
+        if row is None or not os.path.exists(self.path(row[0])):
+            return None
+        return row
+
+    def put(self, provider, keyword, data):
+        """
+        Validate an image and store it for a keyword.
+        Args:
+            provider (str): The provider name.
+            keyword (str): The image keyword.
+            data (bytes): The image file content.
+        Returns:
+            tuple: (file name, width, height)
+        """
+        if len(data) > MAX_IMAGE_BYTES:
+            raise ValueError(f"image larger than {MAX_IMAGE_BYTES} bytes")
+        image_format, width, height = image_size(data)
+        file = f"{hashlib.sha256(data).hexdigest()[:16]}.{'jpg' if image_format == 'jpeg' else image_format}"
+        path = self.path(file)
+        if not os.path.exists(path):
+            # Write to a temporary file first, so a partial write is never taken for a cached image
+            temporary = f"{path}.{threading.get_ident()}.tmp"
+            with open(temporary, 'wb') as f:
+                f.write(data)
+            os.replace(temporary, path)
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO images (provider, keyword, file, width, height, created) VALUES (?, ?, ?, ?, ?, ?)',
+                (provider, keyword, file, width, height, time.time()),
+            )
+            self._db.commit()
+        return file, width, height
+
+    def size(self, file):
+        """
+        Look up the dimensions of a cached image file.
+        Args:
+            file (str): The file name.
+        Returns:
+            tuple: (width, height), or None if the file isn't in the index
+        """
+        with self._lock:
+            return self._db.execute('SELECT width, height FROM images WHERE file = ? LIMIT 1', (file,)).fetchone()
+
+    def path(self, file):
+        """
+        Get the path of a cached image file.
+        """
+        return os.path.join(self.directory, file)
+
+    def close(self):
+        """
+        Close the cache index.
+        """
+        with self._lock:
+            self._db.close()
+
+def link_assets(markdown, cache, directory, prefix='assets'):
+    """
+    Copy the cached images an article links to into its asset directory, and look up their sizes.
+    Args:
+        markdown (str): The article markdown, linking images as '<prefix>/<file>'.
+        cache (ImageCache): The image cache holding the files.
+        directory (str): The asset directory next to the output file.
+        prefix (str): The relative path of the asset directory in the links.
+    Returns:
+        dict: Maps every local image link to its (width, height)
+    """
+    images = {}
+    for _, src in _MARKDOWN_IMAGE.findall(markdown):
+        folder, _, file = src.rpartition('/')
+        if folder != prefix or src in images:
+            continue
+        source = cache.path(file)
+        target = os.path.join(directory, file)
+        if not os.path.exists(target):
+            if not os.path.exists(source):
+                continue
+            os.makedirs(directory, exist_ok=True)
+            shutil.copyfile(source, target)
+        # The index holds the sizes it validated; only files it doesn't know are read
+        size = cache.size(file)
+        if size is None:
+            with open(target, 'rb') as f:
+                _, *size = image_size(f.read(MAX_IMAGE_BYTES))
+        images[src] = tuple(size)
+    return images
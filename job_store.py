@@ -0,0 +1,132 @@
+# Job Store
+# Description: A durable SQLite store of per-topic pipeline checkpoints, so aibag.py can resume failed or interrupted runs.
+# Author: Nakshatra Ranjan Saha
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+def make_job_key(topic, max_words=None, min_words=None, language='English'):
+    """
+    Build the key of the job generating an article. Options that only change how the article
+    is enriched or rendered are left out, so the generated content is reused across them.
+    Args:
+        topic (str): The topic of the article.
+        max_words (int): The maximum number of words.
+        min_words (int): The minimum number of words.
+        language (str): The language of the article.
+    Returns:
+        str: A SHA-256 hex digest identifying the job
+    """
+    payload = json.dumps([topic, max_words, min_words, language], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class JobStore:
+    """
+    A SQLite backed store of generation jobs and the output of each completed pipeline stage.
+    """
+
+    def __init__(self, path):
+        """
+        Open (or create) the job database.
+        Args:
+            path (str): Path of the SQLite database file.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'key TEXT PRIMARY KEY, topic TEXT NOT NULL, status TEXT NOT NULL, '
+            'output_file TEXT, error TEXT, updated REAL NOT NULL)'
+        )
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS checkpoints ('
+            'key TEXT NOT NULL, stage TEXT NOT NULL, value TEXT NOT NULL, created REAL NOT NULL, '
+            'PRIMARY KEY (key, stage))'
+        )
+        self._db.commit()
+
+    def start(self, key, topic, restart=False):
+        """
+        Mark a job as running and load its checkpoints.
+        Args:
+            key (str): The job key from make_job_key.
+            topic (str): The topic of the article.
+            restart (bool): Drop the job's checkpoints and start from scratch.
+        Returns:
+            dict: The saved output of every completed stage, keyed by stage name
+        """
+        with self._lock:
+            if restart:
+                self._db.execute('DELETE FROM checkpoints WHERE key = ?', (key,))
+            self._db.execute(
+                'INSERT INTO jobs (key, topic, status, updated) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET status = excluded.status, error = NULL, updated = excluded.updated',
+                (key, topic, 'running', time.time()),
+            )
+            self._db.commit()
+            rows = self._db.execute('SELECT stage, value FROM checkpoints WHERE key = ?', (key,)).fetchall()
+        return dict(rows)
+
+    def save(self, key, stage, value):
+        """
+        Checkpoint the output of a completed stage.
+        Args:
+            key (str): The job key.
+            stage (str): The stage name.
+            value (str): The stage output.
+        """
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO checkpoints (key, stage, value, created) VALUES (?, ?, ?, ?)',
+                (key, stage, value, time.time()),
+            )
+            self._db.commit()
+
+    def finish(self, key, output_file=None, error=None):
+        """
+        Record the outcome of a job; its checkpoints are kept either way.
+        Args:
+            key (str): The job key.
+            output_file (str): The saved output file, if the job succeeded.
+            error (str): The error message, if the job failed.
+        """
+        status = 'failed' if error else 'done'
+        with self._lock:
+            self._db.execute(
+                'UPDATE jobs SET status = ?, output_file = COALESCE(?, output_file), error = ?, updated = ? WHERE key = ?',
+                (status, output_file, error, time.time(), key),
+            )
+            self._db.commit()
+
+    def jobs(self, status=None):
+        """
+        List the recorded jobs.
+        Args:
+            status (str): Only list jobs with this status ('running', 'done' or 'failed').
+        Returns:
+            list: Dicts with the key, topic, status, output_file, error and updated time of each job
+        """
+        query = 'SELECT key, topic, status, output_file, error, updated FROM jobs'
+        params = ()
+        if status:
+            query += ' WHERE status = ?'
+            params = (status,)
+        with self._lock:
+            rows = self._db.execute(query + ' ORDER BY updated', params).fetchall()
+        columns = ('key', 'topic', 'status', 'output_file', 'error', 'updated')
+        return [dict(zip(columns, row)) for row in rows]
+
+    def close(self):
+        """
+        Close the job database.
+        """
+        with self._lock:
+            self._db.close()
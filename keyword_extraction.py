@@ -0,0 +1,235 @@
+# Keyword Extraction
+# Description: Local SEO keyword and image topic extraction (TF-IDF and n-gram phrase scoring) for aibag.py, with no API calls.
+# Author: Nakshatra Ranjan Saha
+
+import math
+import os
+import re
+import sqlite3
+import threading
+
+# Common English words that never make useful keywords; they also end candidate phrases
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further get gets had has
+have having he her here hers herself him himself his how i if in into is it its itself just like make
+makes many may me might more most much must my myself need no nor not now of off often on once one only
+or other others our ours ourselves out over own same she should so some such than that the their theirs
+them themselves then there these they this those through to too under until up upon us use used uses
+using very was way ways we well were what when where which while who whom why will with within without
+would yet you your yours yourself yourselves
+""".split())
+
+_WORD = re.compile(r"[^\W\d_][\w'-]*")
+# Sentence and clause boundaries; phrases never span them
+_BOUNDARY = re.compile(r"[.,;:!?()\[\]{}\"\n|/]+")
+_IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_CODE = re.compile(r"`[^`]*`")
+
+def tokenize(text):
+    """
+    Split text into lower-case words.
+    Args:
+        text (str): The text.
+    Returns:
+        list: The words, with surrounding apostrophes and hyphens removed
+    """
+    return [word.strip("'-") for word in _WORD.findall(text.lower())]
+
+def _clean_markdown(text):
+    text = _IMAGE.sub(' ', text)
+    text = _LINK.sub(r'\1', text)
+    return _CODE.sub(' ', text).replace('*', ' ').replace('_', ' ').replace('#', ' ')
+
+def phrase_candidates(text, max_ngram=3):
+    """
+    List the candidate phrases of a text: every n-gram of up to max_ngram words that doesn't
+    contain a stopword or cross a punctuation boundary.
+    Args:
+        text (str): Plain text or markdown.
+        max_ngram (int): The longest phrase, in words.
+    Returns:
+        list: The phrases, in order of appearance and with repeats
+    """
+    phrases = []
+    for segment in _BOUNDARY.split(_clean_markdown(text)):
+        run = []
+        for word in tokenize(segment) + [None]:
+            if word is None or word in STOPWORDS or len(word) < 3:
+                for start in range(len(run)):
+                    for length in range(1, min(max_ngram, len(run) - start) + 1):
+                        phrases.append(' '.join(run[start:start + length]))
+                run = []
+            else:
+                run.append(word)
+    return phrases
+
+class KeywordCorpus:
+    """
+    Document frequencies of candidate phrases over previously generated articles, stored in
+    SQLite, giving the inverse document frequency used by KeywordExtractor.
+    """
+
+    def __init__(self, path):
+        """
+        Open (or create) the corpus database.
+        Args:
+            path (str): Path of the SQLite database file.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, documents INTEGER NOT NULL)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS corpus (id INTEGER PRIMARY KEY CHECK (id = 0), documents INTEGER NOT NULL)')
+        self._db.execute('INSERT OR IGNORE INTO corpus (id, documents) VALUES (0, 0)')
+        self._db.commit()
+
+    def document_frequencies(self, terms):
+        """
+        Look up how many articles contain each term.
+        Args:
+            terms (iterable): The phrases.
+        Returns:
+            tuple: (number of articles in the corpus, {term: number of articles containing it})
+        """
+        terms = list(terms)
+        frequencies = {}
+        with self._lock:
+            documents = self._db.execute('SELECT documents FROM corpus WHERE id = 0').fetchone()[0]
+            # Stay well under SQLite's limit on query parameters
+            for start in range(0, len(terms), 500):
+                batch = terms[start:start + 500]
+                query = f"SELECT term, documents FROM terms WHERE term IN ({','.join('?' * len(batch))})"
+                frequencies.update(self._db.execute(query, batch).fetchall())
+        return documents, frequencies
+
+    def add_document(self, terms):
+        """
+        Count one more article containing the given terms.
+        Args:
+            terms (iterable): The distinct phrases of the article.
+        """
+        with self._lock:
+            self._db.executemany(
+                'INSERT INTO terms (term, documents) VALUES (?, 1) '
+                'ON CONFLICT (term) DO UPDATE SET documents = documents + 1',
+                ((term,) for term in set(terms)),
+            )
+            self._db.execute('UPDATE corpus SET documents = documents + 1 WHERE id = 0')
+            self._db.commit()
+
+    def close(self):
+        """
+        Close the corpus database.
+        """
+        with self._lock:
+            self._db.close()
+
+class KeywordExtractor:
+    """
+    Rank the phrases of an article by TF-IDF against a KeywordCorpus, favouring phrases that
+    repeat, span several words or appear in headings.
+    """
+
+    def __init__(self, corpus=None, max_ngram=3):
+        """
+        Args:
+            corpus (KeywordCorpus): Corpus of earlier articles for the IDF (None weighs every phrase
+                by its frequency alone).
+            max_ngram (int): The longest phrase, in words.
+        """
+        self.corpus = corpus
+        self.max_ngram = max_ngram
+
+    def extract(self, markdown, limit=10):
+        """
+        Extract the keywords of an article.
+        Args:
+            markdown (str): The article.
+            limit (int): The maximum number of keywords.
+        Returns:
+            list: The keywords, best first
+        """
+        counts = {}
+        for phrase in phrase_candidates(markdown, self.max_ngram):
+            counts[phrase] = counts.get(phrase, 0) + 1
+        heading_phrases = set(phrase_candidates(
+            '\n'.join(line for line in markdown.split('\n') if line.startswith('#')), self.max_ngram
+        ))
+
+        # A phrase seen once is usually just a passing word combination
+        phrases = {
+            phrase: count for phrase, count in counts.items()
+            if ' ' not in phrase or count >= 2 or phrase in heading_phrases
+        }
+        # Occurrences inside a longer kept phrase count for that phrase, not for its parts, so
+        # "solar power" isn't outranked by "power" alone
+        own_counts = dict(phrases)
+        for phrase, count in phrases.items():
+            words = phrase.split(' ')
+            if len(words) > 1:
+                for part in (' '.join(words[:-1]), ' '.join(words[1:])):
+                    if part in own_counts:
+                        own_counts[part] -= count
+
+        documents, frequencies = self.corpus.document_frequencies(phrases) if self.corpus is not None else (0, {})
+        scores = {}
+        for phrase, count in own_counts.items():
+            if count <= 0:
+                continue
+            words = phrase.count(' ') + 1
+            idf = math.log((1 + documents) / (1 + frequencies.get(phrase, 0))) + 1
+            score = count * idf * (1 + 0.5 * (words - 1))
+            if phrase in heading_phrases:
+                score *= 1.5
+            scores[phrase] = score
+
+        keywords = []
+        for phrase in sorted(scores, key=scores.get, reverse=True):
+            # Skip phrases that repeat, or are part of, a better keyword
+            padded = f' {phrase} '
+            if any(padded in f' {keyword} ' or f' {keyword} ' in padded for keyword in keywords):
+                continue
+            keywords.append(phrase)
+            if len(keywords) == limit:
+                break
+        return keywords
+
+    def image_topics(self, headline, keywords, limit=4):
+        """
+        Pick image topics for a heading: the article keywords that share a word with it, then
+        the heading's own phrases, then the article's best keywords.
+        Args:
+            headline (str): The heading text.
+            keywords (list): The article keywords, best first.
+            limit (int): The maximum number of topics.
+        Returns:
+            list: The topics, most relevant first
+        """
+        headline_words = set(tokenize(headline))
+        own_phrases = sorted(set(phrase_candidates(headline, self.max_ngram)), key=lambda phrase: -phrase.count(' '))
+        # Keywords sharing the most words with the heading come first
+        related = sorted(
+            (keyword for keyword in keywords if headline_words & set(keyword.split())),
+            key=lambda keyword: -len(headline_words & set(keyword.split())),
+        )
+        topics = []
+        for topic in related + own_phrases + list(keywords):
+            if topic not in topics:
+                topics.append(topic)
+            if len(topics) == limit:
+                break
+        return topics
+
+    def learn(self, markdown):
+        """
+        Add an article to the corpus, so later articles are weighed against it.
+        Args:
+            markdown (str): The article.
+        """
+        if self.corpus is not None:
+            self.corpus.add_document(phrase_candidates(markdown, self.max_ngram))
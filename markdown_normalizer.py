@@ -0,0 +1,241 @@
+# Markdown Normalizer
+# Description: Single-pass cleanup of the markdown generated by the Cohere API, used by aibag.py.
+# Author: Nakshatra Ranjan Saha
+
+def remove_section_markers(line):
+    """
+    Drop the "## Outline:" and "## Article:" markers the model adds between sections.
+    """
+    return line.replace("## Outline:", "").replace("## Article:", "")
+
+def rewrite_heading_prefixes(line):
+    """
+    Turn "## H2:" style prefixes into plain markdown headings.
+    """
+    line = line.replace("#### H4:", "####").replace("### H3:", "###")
+    return line.replace("## H2:", "##").replace("# H1:", "#")
+
+def strip_heading_colons(line):
+    """
+    Remove trailing colons from headings.
+    """
+    return line.rstrip(':') if line.startswith('#') else line
+
+# Each rule is a (trigger, function) pair: the function only runs on lines containing the trigger
+# substring (None runs it on every line). Rules must be idempotent, since the first and last
+# lines of an article are cleaned again after their outer whitespace is stripped.
+DEFAULT_RULES = [
+    ('#', remove_section_markers),
+    ('#', rewrite_heading_prefixes),
+    ('#', strip_heading_colons),
+]
+
+class MarkdownNormalizer:
+    """
+    Clean up generated markdown in one pass over its lines: section marker removal, heading
+    prefix rewrites, heading cleanup, a guaranteed top-level title and optional image hooks.
+    Text can be given all at once with normalize() or chunk by chunk with feed() and finish().
+    """
+
+    def __init__(self, title, rules=None, image_hook=None):
+        """
+        Args:
+            title (str): The article title, added as the first heading if the model gives none.
+            rules (list): (trigger, function) line rules, DEFAULT_RULES if not given.
+            image_hook (function): Optional function called with the text of every top-level
+                heading; a non-empty return value is inserted as the line after the heading.
+        """
+        self.title = title
+        self.rules = DEFAULT_RULES if rules is None else rules
+        self.image_hook = image_hook
+        # Lines without any rule trigger are copied through untouched; None means every line
+        triggers = [trigger for trigger, _ in self.rules]
+        self._triggers = None if None in triggers else list(dict.fromkeys(triggers))
+        self.reset()
+
+    def reset(self):
+        """
+        Forget any text seen so far.
+        """
+        self.started = False
+        self._partial = ""
+        self._held = None
+        self._held_is_first = False
+        self._blank_lines = []
+
+    def normalize(self, text):
+        """
+        Normalize a complete article. Gives the same lines as feed() and finish(), but only the
+        lines containing a rule trigger go through Python code: the rest of the text is split and
+        copied in C, a stretch of lines at a time.
+        Args:
+            text (str): The raw content returned by the model.
+        Returns:
+            list: The cleaned lines of the article
+        """
+        self.reset()
+        lines, headings = self._clean_lines(text)
+        apply_rules = self._apply_rules
+
+        # Find the first and last lines with content
+        first = 0
+        while first < len(lines) and not lines[first].strip():
+            first += 1
+        if first == len(lines):
+            output = self.feed(text) + self.finish()
+            self.reset()
+            return output
+        last = len(lines) - 1
+        while not lines[last].strip():
+            last -= 1
+
+        output = []
+        # Like the stream, the first and last lines are cleaned again once their outer whitespace is gone
+        first_line = apply_rules(lines[first].lstrip())
+        if first == last:
+            first_line = apply_rules(first_line.rstrip())
+        # Ensure the first line is a top-level heading
+        if not first_line.startswith("# "):
+            self._emit(f"# {self.title}", output)
+            output.append("")
+        self._emit(first_line, output)
+
+        if self.image_hook is None:
+            output.extend(lines[first + 1:last])
+        else:
+            start = first + 1
+            for index in headings:
+                if first < index < last:
+                    output.extend(lines[start:index + 1])
+                    image = self.image_hook(lines[index][2:])
+                    if image:
+                        output.append(image)
+                    start = index + 1
+            output.extend(lines[start:last])
+
+        if first != last:
+            self._emit(apply_rules(lines[last].rstrip()), output)
+        return output
+
+    def _clean_lines(self, text):
+        """
+        Split a text into lines and run the rules on the lines containing their triggers.
+        Returns:
+            tuple: (lines, indexes of the top-level heading lines)
+        """
+        apply_rules = self._apply_rules
+        triggers = self._triggers
+        if triggers is None or len(triggers) != 1:
+            lines = text.split('\n')
+            headings = []
+            for index, line in enumerate(lines):
+                if triggers is None or any(trigger in line for trigger in triggers):
+                    line = lines[index] = apply_rules(line)
+                    if line.startswith('# '):
+                        headings.append(index)
+            return lines, headings
+
+        # A single trigger (the default rules): jump from one occurrence to the next with str.find
+        trigger = triggers[0]
+        lines = []
+        headings = []
+        start = 0
+        found = text.find(trigger)
+        while found != -1:
+            # start is always the beginning of a line
+            line_start = max(start, text.rfind('\n', start, found) + 1)
+            line_end = text.find('\n', found)
+            if line_end == -1:
+                line_end = len(text)
+            if line_start > start:
+                lines += text[start:line_start - 1].split('\n')
+            line = apply_rules(text[line_start:line_end])
+            if line.startswith('# '):
+                headings.append(len(lines))
+            lines.append(line)
+            start = line_end + 1
+            found = text.find(trigger, start)
+        if start <= len(text):
+            lines += text[start:].split('\n')
+        return lines, headings
+
+    def feed(self, text):
+        """
+        Add a chunk of raw text.
+        Args:
+            text (str): The next chunk of the model output.
+        Returns:
+            list: The output lines this chunk completed
+        """
+        output = []
+        text = self._partial + text
+        start = 0
+        end = text.find('\n')
+        while end != -1:
+            self._add_line(text[start:end], output)
+            start = end + 1
+            end = text.find('\n', start)
+        self._partial = text[start:]
+        return output
+
+    def finish(self):
+        """
+        Flush the remaining text once the model output has ended.
+        Returns:
+            list: The last output lines
+        """
+        output = []
+        if self._partial:
+            self._add_line(self._partial, output)
+            self._partial = ""
+        if self._held is not None:
+            # The article's trailing whitespace is stripped, like the blank lines after it
+            self._emit_held(self._apply_rules(self._held.rstrip()), output)
+            self._held = None
+        elif not self.started:
+            # An empty article still gets its title, followed by the empty body
+            self.started = True
+            self._emit(f"# {self.title}", output)
+            output.extend(["", ""])
+        self._blank_lines = []
+        return output
+
+    def _apply_rules(self, line):
+        for trigger, rule in self.rules:
+            if trigger is None or trigger in line:
+                line = rule(line)
+        return line
+
+    def _add_line(self, raw_line, output):
+        line = self._apply_rules(raw_line)
+        # Blank lines are held back so that none are written before the title or after the last line
+        if not line.strip():
+            if self.started:
+                self._blank_lines.append(line)
+            return
+        if not self.started:
+            self.started = True
+            self._held_is_first = True
+            line = self._apply_rules(line.lstrip())
+        else:
+            # The previous content line is now known not to be the last one
+            self._emit_held(self._held, output)
+            output.extend(self._blank_lines)
+            self._blank_lines = []
+        self._held = line
+
+    def _emit_held(self, line, output):
+        if self._held_is_first:
+            self._held_is_first = False
+            # Ensure the first line is a top-level heading
+            if not line.startswith("# "):
+                self._emit(f"# {self.title}", output)
+                output.append("")
+        self._emit(line, output)
+
+    def _emit(self, line, output):
+        output.append(line)
+        if self.image_hook is not None and line.startswith('# '):
+            image = self.image_hook(line[2:])
+            if image:
+                output.append(image)
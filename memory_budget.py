@@ -0,0 +1,101 @@
+# Memory Budget
+# Description: Per-article accounting of the text buffers held by aibag.py, with an optional memory ceiling and the peak figure.
+# Author: Nakshatra Ranjan Saha
+
+import contextlib
+import sys
+
+class MemoryLimitError(RuntimeError):
+    """
+    Raised when the buffers of an article grow past its memory ceiling.
+    """
+
+def text_size(value):
+    """
+    Measure the memory held by a text buffer, including the Python object overhead.
+    Args:
+        value: A string, a list or tuple of strings (lines or chunks), or None.
+    Returns:
+        int: The size in bytes
+    """
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return sys.getsizeof(value)
+    return sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value)
+
+def format_bytes(size):
+    """
+    Format a byte count for messages, e.g. '12.3 MB'.
+    """
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024 or unit == 'MB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+class ArticleMemory:
+    """
+    Track the size of the named buffers an article holds (the streamed lines, the enriched markdown,
+    the translations...) and the peak of their total, failing the article if it goes over a ceiling.
+    """
+
+    def __init__(self, limit=None):
+        """
+        Args:
+            limit (int): The ceiling in bytes (None or 0 for no ceiling).
+        """
+        self.limit = limit
+        self.buffers = {}
+        self.current = 0
+        self.peak = 0
+
+    def track(self, name, value=None, size=None):
+        """
+        Set the size of a buffer.
+        Args:
+            name (str): The buffer name.
+            value: The buffer (see text_size), measured if size isn't given.
+            size (int): The size in bytes.
+        """
+        size = text_size(value) if size is None else size
+        self.current += size - self.buffers.get(name, 0)
+        self.buffers[name] = size
+        if self.current > self.peak:
+            self.peak = self.current
+        if self.limit and self.current > self.limit:
+            raise MemoryLimitError(
+                f"The article needs more than {format_bytes(self.limit)} of memory "
+                f"(its {name} buffer holds {format_bytes(size)})"
+            )
+
+    def grow(self, name, size):
+        """
+        Add to the size of a buffer, e.g. for every batch of streamed lines.
+        Args:
+            name (str): The buffer name.
+            size (int): The added size in bytes.
+        """
+        self.track(name, size=self.buffers.get(name, 0) + size)
+
+    def release(self, name):
+        """
+        Forget a buffer that is no longer held.
+        Args:
+            name (str): The buffer name.
+        """
+        self.current -= self.buffers.pop(name, 0)
+
+    @contextlib.contextmanager
+    def holding(self, name, value=None, size=None):
+        """
+        Count a temporary buffer, such as a joined copy of the lines, while it is in use.
+        Args:
+            name (str): The buffer name.
+            value: The buffer (see text_size), measured if size isn't given.
+            size (int): The size in bytes.
+        """
+        try:
+            self.track(name, value, size)
+            yield
+        finally:
+            self.release(name)
@@ -0,0 +1,233 @@
+# Metrics
+# Description: Per-stage and per-model-call instrumentation for aibag.py, with JSON lines and Prometheus text export.
+# Author: Nakshatra Ranjan Saha
+
+import collections
+import contextlib
+import contextvars
+import json
+import math
+import threading
+import time
+
+# The topic of the article being generated by the current task, attached to every event
+current_topic = contextvars.ContextVar('current_topic', default=None)
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of a list of numbers.
+    Args:
+        values (list): The numbers (need not be sorted).
+        fraction (float): The percentile as a fraction, e.g. 0.95.
+    Returns:
+        float: The percentile, or 0.0 for an empty list
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+class MetricsRecorder:
+    """
+    Collects timing events for pipeline stages ('stage') and Cohere API calls ('model_call').
+    Every event is a flat dict with at least 'type', 'name', 'topic', 'time' and 'latency'.
+    The counts and counters are kept as running totals, so the summary never goes back over old events.
+    """
+
+    def __init__(self, window=None):
+        """
+        Args:
+            window (int): Keep only the latest `window` events, and compute the latency quantiles of
+                each stage or task over its latest `window` runs. The counts and counters still cover
+                every event. None keeps everything, which suits a single run but not a service.
+        """
+        self._lock = threading.Lock()
+        self.set_window(window)
+
+    def set_window(self, window):
+        """
+        Change the number of events kept, dropping all recorded events.
+        Args:
+            window (int): See __init__.
+        """
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        """
+        Drop all recorded events.
+        """
+        with self._lock:
+            self.events = collections.deque(maxlen=self.window)
+            self._groups = {}
+
+    def record(self, event_type, name, **fields):
+        """
+        Record one event.
+        Args:
+            event_type (str): 'stage' or 'model_call'.
+            name (str): The stage name or model call task.
+            **fields: Measurements such as latency, bytes, input_tokens, output_tokens, retries, cache_hit
+                and peak_bytes.
+        """
+        event = {'type': event_type, 'name': name, 'topic': current_topic.get(), 'time': time.time()}
+        event.update(fields)
+        with self._lock:
+            self.events.append(event)
+            group = self._groups.get((event_type, name))
+            if group is None:
+                group = self._groups[(event_type, name)] = {
+                    'latencies': collections.deque(maxlen=self.window), 'count': 0, 'latency_sum': 0.0,
+                    'bytes': 0, 'input_tokens': 0, 'output_tokens': 0, 'retries': 0,
+                    'cache_hits': 0, 'errors': 0, 'peak_bytes': 0,
+                }
+            latency = event.get('latency', 0.0)
+            group['latencies'].append(latency)
+            group['count'] += 1
+            group['latency_sum'] += latency
+            group['bytes'] += event.get('bytes', 0)
+            group['input_tokens'] += event.get('input_tokens') or 0
+            group['output_tokens'] += event.get('output_tokens') or 0
+            group['retries'] += event.get('retries', 0)
+            group['cache_hits'] += 1 if event.get('cache_hit') else 0
+            group['errors'] += 1 if event.get('status') == 'error' else 0
+            group['peak_bytes'] = max(group['peak_bytes'], event.get('peak_bytes') or 0)
+
+    @contextlib.contextmanager
+    def stage(self, name, **fields):
+        """
+        Time a pipeline stage. The yielded dict can be filled in with extra measurements (e.g. bytes).
+        Args:
+            name (str): The stage name.
+            **fields: Measurements known up front.
+        """
+        start = time.perf_counter()
+        info = dict(fields)
+        info['status'] = 'ok'
+        try:
+            yield info
+        except BaseException:
+            info['status'] = 'error'
+            raise
+        finally:
+            self.record('stage', name, latency=time.perf_counter() - start, **info)
+
+    def summary(self):
+        """
+        Aggregate the events by type and name.
+        Returns:
+            dict: Maps (type, name) to count, latency p50/p95/sum, summed counters and the largest peak_bytes
+        """
+        with self._lock:
+            groups = {key: dict(group, latencies=list(group['latencies'])) for key, group in self._groups.items()}
+
+        summary = {}
+        for key, group in sorted(groups.items()):
+            latencies = group.pop('latencies')
+            summary[key] = {
+                'count': group.pop('count'),
+                'p50': percentile(latencies, 0.5),
+                'p95': percentile(latencies, 0.95),
+                **group,
+            }
+        return summary
+
+    def format_summary(self):
+        """
+        Format the p50/p95 latency summary as a text table.
+        Returns:
+            list: The lines of the table
+        """
+        lines = [f"{'type':<11} {'name':<24} {'count':>6} {'p50 (s)':>9} {'p95 (s)':>9} {'tokens in':>10} {'tokens out':>10} {'retries':>8} {'cached':>7}"]
+        for (event_type, name), values in self.summary().items():
+            lines.append(
+                f"{event_type:<11} {name:<24} {values['count']:>6} {values['p50']:>9.3f} {values['p95']:>9.3f} "
+                f"{values['input_tokens']:>10} {values['output_tokens']:>10} {values['retries']:>8} {values['cache_hits']:>7}"
+            )
+        return lines
+
+    def write_jsonl(self, path):
+        """
+        Export every recorded event (the latest `window` with a window) as one JSON object per line.
+        Args:
+            path (str): The output file path.
+        """
+        with self._lock:
+            events = list(self.events)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(event, ensure_ascii=False) + '\n' for event in events))
+
+    def write_prometheus(self, path):
+        """
+        Export the aggregated metrics in the Prometheus text exposition format.
+        Args:
+            path (str): The output file path (e.g. for the node exporter textfile collector).
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.format_prometheus())
+
+    def format_prometheus(self):
+        """
+        Format the aggregated metrics in the Prometheus text exposition format.
+        Returns:
+            str: The metrics text
+        """
+        summary = self.summary()
+        lines = []
+
+        def family(metric, metric_type, help_text, samples):
+            if samples:
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} {metric_type}")
+                lines.extend(samples)
+
+        for event_type, label in (('stage', 'stage'), ('model_call', 'task')):
+            metric = f"aibag_{event_type}_latency_seconds"
+            samples = []
+            for (kind, name), values in summary.items():
+                if kind != event_type:
+                    continue
+                labels = f'{label}="{_escape_label(name)}"'
+                samples.append(f'{metric}{{{labels},quantile="0.5"}} {values["p50"]:.6f}')
+                samples.append(f'{metric}{{{labels},quantile="0.95"}} {values["p95"]:.6f}')
+                samples.append(f'{metric}_sum{{{labels}}} {values["latency_sum"]:.6f}')
+                samples.append(f'{metric}_count{{{labels}}} {values["count"]}')
+            family(metric, 'summary', f"Latency of each {label} in seconds.", samples)
+
+        counters = (
+            ('aibag_stage_bytes_total', 'stage', 'stage', 'bytes', "Bytes produced by each stage."),
+            ('aibag_stage_errors_total', 'stage', 'stage', 'errors', "Failed runs of each stage."),
+            ('aibag_stage_retries_total', 'stage', 'stage', 'retries', "Retries made while running each stage."),
+            ('aibag_model_input_tokens_total', 'model_call', 'task', 'input_tokens', "Input tokens billed per model call task."),
+            ('aibag_model_output_tokens_total', 'model_call', 'task', 'output_tokens', "Output tokens billed per model call task."),
+            ('aibag_model_retries_total', 'model_call', 'task', 'retries', "Retried model calls per task."),
+            ('aibag_model_cache_hits_total', 'model_call', 'task', 'cache_hits', "Model calls answered by the response cache."),
+        )
+        for metric, event_type, label, field, help_text in counters:
+            samples = [
+                f'{metric}{{{label}="{_escape_label(name)}"}} {values[field]}'
+                for (kind, name), values in summary.items() if kind == event_type
+            ]
+            family(metric, 'counter', help_text, samples)
+
+        family('aibag_stage_peak_bytes', 'gauge', "Largest memory held by the text buffers of one run of each stage.", [
+            f'aibag_stage_peak_bytes{{stage="{_escape_label(name)}"}} {values["peak_bytes"]}'
+            for (kind, name), values in summary.items() if kind == 'stage' and values['peak_bytes']
+        ])
+
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path):
+        """
+        Export the metrics, as Prometheus text for '.prom' files and JSON lines otherwise.
+        Args:
+            path (str): The output file path.
+        """
+        if path.endswith('.prom'):
+            self.write_prometheus(path)
+        else:
+            self.write_jsonl(path)
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,204 @@
+# Renderers
+# Description: Output renderers (HTML, Markdown, GitHub README, JSON) for the articles generated by aibag.py.
+# Author: Nakshatra Ranjan Saha
+
+import html
+import json
+import re
+
+# The static parts of the HTML page are built once per process; rendering an article only fills in
+# the escaped metadata and the markdown between them.
+# IMPORTANT: Dont change the format of the HTML content. It is required for perfect rendering and indentation of the blog content.
+_HTML_FRAGMENTS = (
+    """<!DOCTYPE html>
+<html lang=\"""",
+    """">
+
+   <head>
+      <meta charset="UTF-8">
+      <meta name="description" content=\"""",
+    """">
+      <meta name="keywords" content=\"""",
+    """">
+      <meta name="viewport" content="width=device-width, initial-scale=1.0">
+      <title>""",
+    """</title>
+      <style>
+         body {
+            font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif;
+         }
+      </style>
+   </head>
+
+   <body>
+      <markdown>
+         """,
+    """
+      </markdown>
+      <script src="https://cdn.jsdelivr.net/gh/OCEANOFANYTHINGOFFICIAL/mdonhtml.js/scripts/mdonhtml.min.js"></script>
+   </body>
+
+</html>""",
+)
+
+# BCP-47 tags of the language names aibag.py is usually given (--language, --languages)
+LANGUAGE_TAGS = {
+    'english': 'en', 'french': 'fr', 'spanish': 'es', 'german': 'de', 'italian': 'it',
+    'portuguese': 'pt', 'brazilian portuguese': 'pt-BR', 'dutch': 'nl', 'swedish': 'sv',
+    'norwegian': 'no', 'danish': 'da', 'finnish': 'fi', 'polish': 'pl', 'czech': 'cs',
+    'greek': 'el', 'turkish': 'tr', 'russian': 'ru', 'ukrainian': 'uk', 'arabic': 'ar',
+    'hebrew': 'he', 'persian': 'fa', 'hindi': 'hi', 'bengali': 'bn', 'urdu': 'ur',
+    'tamil': 'ta', 'telugu': 'te', 'marathi': 'mr', 'thai': 'th', 'vietnamese': 'vi',
+    'indonesian': 'id', 'malay': 'ms', 'chinese': 'zh', 'simplified chinese': 'zh-Hans',
+    'traditional chinese': 'zh-Hant', 'japanese': 'ja', 'korean': 'ko',
+}
+
+# A language given as a tag already, e.g. 'fr' or 'pt-BR'
+_LANGUAGE_TAG = re.compile(r"^[A-Za-z]{2,3}(-[A-Za-z0-9]{2,8})*$")
+
+def language_tag(language):
+    """
+    Get the BCP-47 tag of a language for the lang attribute of a page.
+    Args:
+        language (str): A language name such as 'French', or a tag such as 'pt-BR'.
+    Returns:
+        str: The language tag, 'en' if the language is unknown
+    """
+    language = (language or '').strip()
+    tag = LANGUAGE_TAGS.get(language.lower())
+    if tag:
+        return tag
+    return language if _LANGUAGE_TAG.match(language) else 'en'
+
+# A markdown image: ![alt](src)
+_MARKDOWN_IMAGE = re.compile(r"!\[([^\]]*)\]\(([^)\s]+)\)")
+
+def sized_images(markdown, images):
+    """
+    Replace the markdown links of local images with <img> tags that carry their dimensions, so the
+    page layout doesn't shift while they load.
+    Args:
+        markdown (str): The article markdown.
+        images (dict): Maps image links to their (width, height); other images are left as they are.
+    Returns:
+        iterator: The markdown with sized images, in chunks, so it is never copied as a whole
+    """
+    if not images:
+        yield markdown
+        return
+    position = 0
+    for match in _MARKDOWN_IMAGE.finditer(markdown):
+        alt, src = match.groups()
+        if src not in images:
+            continue
+        width, height = images[src]
+        yield markdown[position:match.start()]
+        yield f'<img src="{html.escape(src)}" alt="{html.escape(alt)}" width="{width}" height="{height}">'
+        position = match.end()
+    yield markdown[position:] if position else markdown
+
+def render_html(article):
+    """
+    Render an article as an HTML page that displays its markdown with mdonhtml.js.
+    Args:
+        article (dict): The article, with 'title', 'description', 'keywords' and 'markdown' keys, and
+            optionally its 'language' and the 'images' sizes from image_assets.link_assets.
+    Returns:
+        iterator: The HTML document, in chunks
+    """
+    head, language_end, description_end, keywords_end, title_end, markdown_end = _HTML_FRAGMENTS
+    yield head
+    yield language_tag(article.get('language'))
+    yield language_end
+    yield html.escape(article['description'])
+    yield description_end
+    yield html.escape(article['keywords'])
+    yield keywords_end
+    yield html.escape(article['title'], quote=False)
+    yield title_end
+    yield from sized_images(article['markdown'], article.get('images'))
+    yield markdown_end
+
+def render_markdown(article):
+    """
+    Render an article as plain markdown.
+    Args:
+        article (dict): The article, with a 'markdown' key and optionally the 'images' sizes.
+    Returns:
+        iterator: The markdown document, in chunks
+    """
+    return sized_images(article['markdown'], article.get('images'))
+
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, indent=2)
+
+def render_json(article):
+    """
+    Render an article as a JSON document for a CMS.
+    Args:
+        article (dict): The article, with 'title', 'description', 'keywords' and 'markdown' keys, and
+            optionally the 'images' sizes.
+    Returns:
+        iterator: The JSON document, in chunks
+    """
+    keywords = [keyword.strip() for keyword in article['keywords'].split(',') if keyword.strip()]
+    return _JSON_ENCODER.iterencode({
+        'title': article['title'],
+        'description': article['description'],
+        'keywords': keywords,
+        'language': article.get('language'),
+        'markdown': article['markdown'],
+        'images': [
+            {'src': src, 'width': width, 'height': height} for src, (width, height) in (article.get('images') or {}).items()
+        ],
+    })
+
+# Output format name -> (file extension, render function)
+RENDERERS = {
+    'html': ('html', render_html),
+    'md': ('md', render_markdown),
+    'markdown': ('md', render_markdown),
+    'github': ('md', render_markdown),
+    'json': ('json', render_json),
+}
+
+def register_renderer(output_format, extension, render):
+    """
+    Add (or replace) an output format.
+    Args:
+        output_format (str): The format name used with --output_format.
+        extension (str): The file extension of the rendered files.
+        render (function): A function taking the article dict and returning the file content, as a
+            string or as an iterable of string chunks.
+    """
+    RENDERERS[output_format.lower()] = (extension, render)
+
+def get_renderer(output_format):
+    """
+    Look up the renderer for an output format.
+    Args:
+        output_format (str): The output format name (case insensitive).
+    Returns:
+        tuple: The (file extension, render function) pair
+    """
+    try:
+        return RENDERERS[output_format.lower()]
+    except KeyError:
+        raise ValueError(f"Invalid output format: {output_format}") from None
+
+def write_article(path, article, output_format):
+    """
+    Render an article and save it chunk by chunk through the file buffer, so the whole document
+    is never built in memory.
+    Args:
+        path (str): The output file path.
+        article (dict): The article to render.
+        output_format (str): The output format name.
+    """
+    _, render = get_renderer(output_format)
+    content = render(article)
+    with open(path, 'w', encoding='utf-8') as f:
+        if isinstance(content, str):
+            f.write(content)
+        else:
+            for chunk in content:
+                f.write(chunk)
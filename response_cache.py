@@ -0,0 +1,111 @@
+# Response Cache
+# Description: A persistent, content-addressed cache for Cohere API responses used by aibag.py.
+# Author: Nakshatra Ranjan Saha
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Default cache limits: 512 MB of responses, each kept for up to 30 days
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_TTL = 30 * 24 * 60 * 60
+
+def make_cache_key(kind, model, prompt, temperature, max_tokens=None):
+    """
+    Build the cache key for a model request.
+    Args:
+        kind (str): The type of API call ('chat' or 'generate').
+        model (str): The model name.
+        prompt (str): The full prompt or chat message.
+        temperature (float): The sampling temperature.
+        max_tokens (int): The output token limit, if any.
+    Returns:
+        str: A SHA-256 hex digest identifying the request
+    """
+    payload = json.dumps([kind, model, prompt, temperature, max_tokens], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """
+    A SQLite backed response cache with a time-to-live and size-based LRU eviction.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        """
+        Open (or create) the cache database.
+        Args:
+            path (str): Path of the SQLite database file.
+            max_bytes (int): Total size of cached responses before the least recently used are evicted.
+            ttl (int): Seconds a response stays valid after it was stored.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, '
+            'created REAL NOT NULL, accessed REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+        self._db.commit()
+
+    def get(self, key):
+        """
+        Look up a cached response.
+        Args:
+            key (str): The cache key from make_cache_key.
+        Returns:
+            str: The cached response, or None if it is missing or expired
+        """
+        now = time.time()
+        with self._lock:
+            row = self._db.execute('SELECT value, created FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl is not None and created + self.ttl < now:
+                self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self._db.commit()
+                return None
+            self._db.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+            self._db.commit()
+        return value
+
+    def set(self, key, value):
+        """
+        Store a response and evict the least recently used entries if the cache is over its size limit.
+        Args:
+            key (str): The cache key from make_cache_key.
+            value (str): The response text.
+        """
+        now = time.time()
+        size = len(value.encode('utf-8'))
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)',
+                (key, value, size, now, now),
+            )
+            total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            if total > self.max_bytes:
+                evicted = 0
+                for old_key, old_size in self._db.execute('SELECT key, size FROM responses ORDER BY accessed').fetchall():
+                    if total - evicted <= self.max_bytes:
+                        break
+                    self._db.execute('DELETE FROM responses WHERE key = ?', (old_key,))
+                    evicted += old_size
+            self._db.commit()
+
+    def close(self):
+        """
+        Close the cache database.
+        """
+        with self._lock:
+            self._db.close()
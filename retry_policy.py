@@ -0,0 +1,188 @@
+# Retry Policy
+# Description: Shared retry, backoff and client-side rate limiting for the Cohere API calls made by aibag.py.
+# Author: Nakshatra Ranjan Saha
+
+import asyncio
+import contextvars
+import email.utils
+import random
+import time
+
+# HTTP status codes that are worth another attempt; any other API error is treated as fatal
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+# Retry-After of the last failed response seen by the current task, recorded by the httpx hook
+_retry_after = contextvars.ContextVar('retry_after', default=None)
+
+def parse_retry_after(headers):
+    """
+    Read the server's requested wait from Retry-After (seconds or an HTTP date) or Retry-After-Ms.
+    Args:
+        headers (Mapping): The response headers.
+    Returns:
+        float: The number of seconds to wait, or None if the response doesn't say
+    """
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms is not None:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000)
+        except ValueError:
+            pass
+    retry_after = headers.get('retry-after')
+    if retry_after is None:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    retry_date = email.utils.parsedate_tz(retry_after)
+    if retry_date is None:
+        return None
+    return max(0.0, email.utils.mktime_tz(retry_date) - time.time())
+
+async def record_retry_after(response):
+    """
+    httpx response hook that remembers the Retry-After of rate limited or unavailable responses,
+    since the Cohere SDK doesn't keep the headers on the exceptions it raises.
+    """
+    if response.status_code in RETRYABLE_STATUS_CODES:
+        _retry_after.set(parse_retry_after(response.headers))
+
+def get_retry_after(error):
+    """
+    Get the server's requested wait for a failed call.
+    Args:
+        error (Exception): The exception raised by the call.
+    Returns:
+        float: The number of seconds to wait, or None if the server didn't say
+    """
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after is not None:
+        return retry_after
+    headers = getattr(error, 'headers', None)
+    if headers:
+        return parse_retry_after(headers)
+    return _retry_after.get()
+
+class TokenBucket:
+    """
+    Client-side rate limiter shared by all concurrent workers. Requests wait for a token instead of
+    being sent and rejected with a 429, and a server Retry-After pauses every worker at once.
+    """
+
+    def __init__(self, rate_per_minute=None, burst=None):
+        """
+        Args:
+            rate_per_minute (float): Sustained requests per minute allowed by the API quota
+                (None disables the limit).
+            burst (int): How many requests may be sent back to back (defaults to one second's worth, at least 1).
+        """
+        self.configure(rate_per_minute, burst)
+
+    def configure(self, rate_per_minute=None, burst=None):
+        """
+        Change the rate limit; the bucket starts full.
+        """
+        self.rate = rate_per_minute / 60 if rate_per_minute else None
+        self.capacity = burst or max(1.0, self.rate or 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def pause(self, seconds):
+        """
+        Hold back every request for the given number of seconds.
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        """
+        Wait until a request may be sent.
+        """
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            if self.rate is None:
+                return
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter that honours Retry-After and only retries transient errors.
+    """
+
+    def __init__(self, max_attempts=5, base_delay=1.0, max_delay=60.0):
+        """
+        Args:
+            max_attempts (int): The maximum number of attempts per call.
+            base_delay (float): The backoff ceiling in seconds after the first failure; it doubles each attempt.
+            max_delay (float): The longest wait between attempts, in seconds.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def is_retryable(self, error):
+        """
+        Decide whether a failed call is worth retrying.
+        Args:
+            error (Exception): The exception raised by the call.
+        Returns:
+            bool: True for rate limits, server errors, timeouts and connection problems
+        """
+        status_code = getattr(error, 'status_code', None)
+        if status_code is not None:
+            return status_code in RETRYABLE_STATUS_CODES
+        # httpx is loaded along with the Cohere client, so importing it here costs nothing at startup
+        import httpx
+        return isinstance(error, (httpx.TransportError, asyncio.TimeoutError, ConnectionError, TimeoutError))
+
+    def delay(self, attempt, error):
+        """
+        Work out how long to wait before the next attempt.
+        Args:
+            attempt (int): The attempt that just failed, starting at 1.
+            error (Exception): The exception raised by the call.
+        Returns:
+            float: The number of seconds to wait
+        """
+        retry_after = get_retry_after(error)
+        if retry_after is not None:
+            # Spread the workers out a little so they don't all come back at the same instant
+            return min(retry_after, self.max_delay) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def run(self, func, *args, rate_limiter=None, on_retry=None, **kwargs):
+        """
+        Call a coroutine function, retrying transient failures.
+        Args:
+            func (function): The coroutine function to call. It should acquire a rate limiter
+                token itself right before each request, so that cache hits don't use one.
+            rate_limiter (TokenBucket): Optional limiter that is paused for every worker when a
+                call is rate limited.
+            on_retry (function): Optional callback taking (attempt, error, delay) before each wait.
+        Returns:
+            The result of the call
+        """
+        attempt = 1
+        while True:
+            _retry_after.set(None)
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_attempts or not self.is_retryable(e):
+                    raise
+                delay = self.delay(attempt, e)
+                if rate_limiter is not None and getattr(e, 'status_code', None) == 429:
+                    rate_limiter.pause(delay)
+                if on_retry is not None:
+                    on_retry(attempt, e, delay)
+                await asyncio.sleep(delay)
+                attempt += 1
@@ -0,0 +1,422 @@
+# AI Blog Article Generator Service
+# Description: A long-running localhost HTTP/JSON API around aibag.py, with a warm Cohere client, per-tenant concurrency limits and request coalescing.
+# Author: Nakshatra Ranjan Saha
+# Usage: python service.py [--host 127.0.0.1] [--port 8765] [--tenant_limit 2] [--workers 8]
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import queue
+import sys
+import threading
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aibag
+from memory_budget import ArticleMemory
+
+# Request fields passed to agenerate_blog, with their expected types
+ARTICLE_FIELDS = {
+    'topic': str,
+    'max_words': int,
+    'min_words': int,
+    'language': str,
+    'output_format': str,
+    'file_name': str,
+    'keyword_mode': str,
+    'translations': list,
+}
+
+# Marks the end of a streamed generation in a subscriber's queue
+_DONE = object()
+
+class Generation:
+    """
+    One in-flight article generation, shared by every request that asked for the same article.
+    Streamed lines are kept so that requests joining late still receive the whole article, and
+    are counted against the article's memory budget as the 'published' buffer.
+    """
+
+    def __init__(self, memory=None):
+        """
+        Args:
+            memory (ArticleMemory): The memory budget of the article, given to agenerate_blog too.
+        """
+        self.memory = memory if memory is not None else ArticleMemory()
+        self.lines = []
+        self.subscribers = []
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """
+        Follow the generation's streamed lines.
+        Returns:
+            queue.Queue: Receives lists of lines, None when the stream restarts, and _DONE at the end
+        """
+        subscriber = queue.Queue()
+        with self._lock:
+            if self.lines:
+                subscriber.put(list(self.lines))
+            if self.done.is_set():
+                subscriber.put(_DONE)
+            else:
+                self.subscribers.append(subscriber)
+        return subscriber
+
+    def publish(self, lines):
+        """
+        Hand a batch of lines (or None for a restart) to every subscriber.
+        """
+        with self._lock:
+            if lines is None:
+                self.lines = []
+                self.memory.release('published')
+            else:
+                self.lines.extend(lines)
+            for subscriber in self.subscribers:
+                subscriber.put(lines)
+        if lines is not None:
+            # The lines are shared with the article's own buffer until it lets go of them, after
+            # which only this copy keeps them alive, so they are counted in full
+            self.memory.grow('published', sum(sys.getsizeof(line) + 8 for line in lines))
+
+    def finish(self, result=None, error=None):
+        """
+        Record the outcome and wake everyone waiting for it.
+        """
+        with self._lock:
+            self.result = result
+            self.error = error
+            self.done.set()
+            for subscriber in self.subscribers:
+                subscriber.put(_DONE)
+            self.subscribers = []
+
+class ArticleService:
+    """
+    Runs every generation on one background event loop, so the Cohere client and its connection
+    pool stay warm across requests. Identical requests in flight share one generation, each
+    tenant has its own concurrency limit, and a global limit caps the total.
+    """
+
+    def __init__(self, tenant_limit=2, workers=8, output_dir='.'):
+        """
+        Args:
+            tenant_limit (int): The maximum number of generations in flight per tenant.
+            workers (int): The maximum number of generations in flight in total.
+            output_dir (str): The directory the articles are saved in.
+        """
+        self.tenant_limit = tenant_limit
+        self.workers = workers
+        self.output_dir = output_dir
+        self.in_flight = {}
+        self._lock = threading.Lock()
+        # Tenant -> its concurrency slots, dropped once no generation of the tenant holds them (only touched on the loop)
+        self._tenant_limits = weakref.WeakValueDictionary()
+        # Output file or job key -> the lock of the generation using it (only touched on the loop)
+        self._resource_locks = weakref.WeakValueDictionary()
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+        # Created on the loop, as asyncio primitives belong to the loop they are used on
+        self._workers = asyncio.run_coroutine_threadsafe(self._make_semaphore(workers), self.loop).result()
+
+    async def _make_semaphore(self, limit):
+        return asyncio.Semaphore(limit)
+
+    def warm_up(self):
+        """
+        Import the Cohere SDK and create the client before the first request.
+        """
+        async def create_client():
+            aibag.get_async_client()
+        asyncio.run_coroutine_threadsafe(create_client(), self.loop).result()
+
+    def output_files(self, request):
+        """
+        Get the output paths of a request, and check that the article and its translated variants
+        are all saved inside the output directory.
+        Args:
+            request (dict): The article options (see ARTICLE_FIELDS).
+        Returns:
+            tuple: (the path given to agenerate_blog as its file name, the real paths of every output file)
+        """
+        # Topics are free text, so they are reduced to a safe slug instead of being used as a path
+        base = os.path.join(self.output_dir, request.get('file_name') or aibag.slugify(request['topic']))
+        extension, _ = aibag.get_renderer(request.get('output_format', 'HTML'))
+        path, variant_paths = aibag.output_paths(base, extension, request.get('translations', ()))
+        root = os.path.realpath(self.output_dir)
+        outputs = []
+        for output in (path, *variant_paths.values()):
+            outputs.append(os.path.realpath(output))
+            if os.path.dirname(outputs[-1]) != root:
+                raise ValueError(f"The output file {output} is outside the output directory")
+        return base, outputs
+
+    def submit(self, request, tenant='default'):
+        """
+        Start generating an article, or join the identical generation already in flight.
+        Args:
+            request (dict): The article options (see ARTICLE_FIELDS).
+            tenant (str): The tenant the request counts against.
+        Returns:
+            tuple: (Generation, True if this request started it)
+        """
+        base, outputs = self.output_files(request)
+        # Requests that differ in their render options still write the same files and share the
+        # job's checkpoints, so their generations take turns instead of overlapping
+        job_key = aibag.make_job_key(
+            request['topic'], request.get('max_words'), request.get('min_words'), request.get('language', 'English')
+        )
+        resources = sorted({job_key, *outputs})
+        key = json.dumps([request.get(field) for field in ARTICLE_FIELDS], ensure_ascii=False)
+        with self._lock:
+            generation = self.in_flight.get(key)
+            if generation is not None:
+                return generation, False
+            generation = Generation(ArticleMemory(aibag.MAX_ARTICLE_MEMORY))
+            self.in_flight[key] = generation
+        asyncio.run_coroutine_threadsafe(self._generate(key, generation, request, tenant, base, resources), self.loop)
+        return generation, True
+
+    async def _generate(self, key, generation, request, tenant, base, resources):
+        limit = self._tenant_limits.get(tenant)
+        if limit is None:
+            limit = self._tenant_limits[tenant] = asyncio.Semaphore(self.tenant_limit)
+        try:
+            async with contextlib.AsyncExitStack() as stack:
+                # The locks are taken in sorted order, and before any slot, so waiting never blocks other articles
+                for resource in resources:
+                    await stack.enter_async_context(self._resource_lock(resource))
+                async with limit, self._workers:
+                    options = dict(request)
+                    topic = options.pop('topic')
+                    options['file_name'] = base
+                    result = await aibag.agenerate_blog(
+                        topic, raise_errors=True, stream=True, on_lines=generation.publish,
+                        memory=generation.memory, **options
+                    )
+        except Exception as e:
+            generation.finish(error=str(e))
+        else:
+            generation.finish(result=result)
+        finally:
+            with self._lock:
+                self.in_flight.pop(key, None)
+
+    def _resource_lock(self, resource):
+        # Locks only live while a generation holds or waits for them
+        lock = self._resource_locks.get(resource)
+        if lock is None:
+            lock = self._resource_locks[resource] = asyncio.Lock()
+        return lock
+
+    def close(self):
+        """
+        Stop the event loop.
+        """
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+def parse_article_request(body):
+    """
+    Validate the JSON body of an article request.
+    Args:
+        body (bytes): The request body.
+    Returns:
+        dict: The article options
+    """
+    try:
+        payload = json.loads(body or b'{}')
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON: {e}") from None
+    if not isinstance(payload, dict):
+        raise ValueError('The request body must be a JSON object')
+    request = {}
+    for field, expected in ARTICLE_FIELDS.items():
+        value = payload.get(field)
+        if value is None:
+            continue
+        if not isinstance(value, expected) or isinstance(value, bool):
+            raise ValueError(f"'{field}' must be of type {expected.__name__}")
+        request[field] = value
+    if not request.get('topic', '').strip():
+        raise ValueError("'topic' is required")
+    if not request.get('max_words') and not request.get('min_words'):
+        raise ValueError("At least one of 'max_words' or 'min_words' is required")
+    file_name = request.get('file_name')
+    if file_name and (os.path.basename(file_name) != file_name or file_name in ('.', '..', '-')):
+        raise ValueError("'file_name' must be a plain file name")
+    aibag.get_renderer(request.get('output_format', 'HTML'))
+    if request.get('keyword_mode', aibag.KEYWORD_MODES[0]) not in aibag.KEYWORD_MODES:
+        raise ValueError(f"Invalid keyword mode: {request['keyword_mode']}")
+    if not all(isinstance(language, str) for language in request.get('translations', ())):
+        raise ValueError("'translations' must be a list of language names")
+    return request
+
+def article_outputs(result):
+    """
+    Read back the saved article (and its translations) for a JSON response.
+    Args:
+        result: The return value of agenerate_blog.
+    Returns:
+        dict: Maps each output path to its content (None if the file could not be read)
+    """
+    paths = result.values() if isinstance(result, dict) else [result]
+    outputs = {}
+    for path in paths:
+        if not path:
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                outputs[path] = f.read()
+        except OSError:
+            outputs[path] = None
+    return outputs
+
+def make_handler(service):
+    """
+    Build the HTTP request handler class for a service.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            aibag.print_step(f"{self.address_string()} {format % args}")
+
+        def do_GET(self):
+            if self.path == '/v1/health':
+                self._send_json(200, {'status': 'ok', 'in_flight': len(service.in_flight)})
+            elif self.path == '/metrics':
+                self._send(200, aibag.metrics.format_prometheus().encode('utf-8'), 'text/plain; version=0.0.4')
+            else:
+                self._send_json(404, {'error': f'Unknown endpoint: {self.path}'})
+
+        def do_POST(self):
+            if self.path != '/v1/articles':
+                return self._send_json(404, {'error': f'Unknown endpoint: {self.path}'})
+            try:
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                request = parse_article_request(body)
+                stream = bool(json.loads(body).get('stream'))
+                generation, started = service.submit(request, self.headers.get('X-Tenant') or 'default')
+            except ValueError as e:
+                return self._send_json(400, {'error': str(e)})
+
+            if stream:
+                return self._stream(generation, started)
+            generation.done.wait()
+            if generation.error is not None:
+                return self._send_json(500, {'error': generation.error, 'coalesced': not started})
+            self._send_json(200, {
+                'topic': request['topic'],
+                'output_file': generation.result,
+                'outputs': article_outputs(generation.result),
+                'coalesced': not started,
+            })
+
+        def _stream(self, generation, started):
+            # Newline-delimited JSON events: the cleaned lines as they are written, then the outcome
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            subscriber = generation.subscribe()
+            try:
+                while True:
+                    lines = subscriber.get()
+                    if lines is _DONE:
+                        break
+                    if lines is None:
+                        self._chunk({'event': 'restart'})
+                    else:
+                        self._chunk({'event': 'lines', 'lines': lines})
+                if generation.error is not None:
+                    self._chunk({'event': 'error', 'error': generation.error, 'coalesced': not started})
+                else:
+                    self._chunk({'event': 'done', 'output_file': generation.result, 'coalesced': not started})
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # The client went away; the generation carries on for anyone else waiting on it
+                pass
+
+        def _chunk(self, event):
+            data = (json.dumps(event, ensure_ascii=False) + '\n').encode('utf-8')
+            self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+            self.wfile.flush()
+
+        def _send_json(self, status, payload):
+            self._send(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json')
+
+        def _send(self, status, data, content_type):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+def main():
+    """
+    Parse the command-line arguments and serve the API until interrupted.
+    """
+    parser = argparse.ArgumentParser(description='AI Blog Generator HTTP service')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Interface to listen on (localhost by default)')  # Listen address
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')  # Listen port
+    parser.add_argument('-tl', '--tenant_limit', type=int, default=2, help='Concurrent articles per tenant (X-Tenant header)')  # Per-tenant concurrency limit
+    parser.add_argument('-w', '--workers', type=int, default=8, help='Concurrent articles in total')  # Global concurrency limit
+    parser.add_argument('-od', '--output_dir', type=str, default='.', help='Directory the articles are saved in')  # Output directory
+    parser.add_argument('-rl', '--rate_limit', type=float, help='API quota in requests per minute, shared by all requests')  # Optional client-side rate limit
+    parser.add_argument('-km', '--keyword_mode', type=str, choices=aibag.KEYWORD_MODES, help='Default keyword mode: llm, local or hybrid')  # Optional default keyword mode
+    parser.add_argument('-ip', '--image_provider', type=str, help="Image source: loremflickr, link or an image directory")  # Optional image provider
+    parser.add_argument('-mm', '--max_memory', type=float, help='Memory ceiling of the text buffers of one article, in MB (0 for none)')  # Optional per-article memory ceiling
+    parser.add_argument('-mtw', '--metrics_window', type=int, default=10000, help='Latest events kept for the /metrics latency quantiles')  # Bounded metrics memory
+    parser.add_argument('-nc', '--no_cache', action='store_true', help='Bypass the response cache')  # Flag to bypass the response cache
+    parser.add_argument('-k', '--api_key', type=str, help='Cohere API key (defaults to the CO_API_KEY environment variable)')  # Optional API key
+    args = parser.parse_args()
+
+    if args.tenant_limit < 1 or args.workers < 1:
+        parser.error('--tenant_limit and --workers must be at least 1.')
+    if args.rate_limit is not None and args.rate_limit <= 0:
+        parser.error('--rate_limit must be positive.')
+    if args.max_memory is not None and args.max_memory < 0:
+        parser.error('--max_memory cannot be negative.')
+    if args.metrics_window < 1:
+        parser.error('--metrics_window must be at least 1.')
+
+    aibag.init(autoreset=True)
+    aibag.configure_client(args.api_key)
+    aibag.configure_rate_limit(args.rate_limit)
+    aibag.configure_keywords(args.keyword_mode)
+    aibag.configure_memory(args.max_memory)
+    # A long-running service keeps running totals and a bounded window of events, not every event
+    aibag.metrics.set_window(args.metrics_window)
+    try:
+        aibag.configure_images(args.image_provider)
+    except ValueError as e:
+        parser.error(str(e))
+    aibag.configure_cache('off' if args.no_cache else 'use')
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    service = ArticleService(args.tenant_limit, args.workers, args.output_dir)
+    service.warm_up()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    server.daemon_threads = True
+    aibag.print_success(f"Serving the blog generator on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The modules live at the top of the repository, the benchmark helpers in benchmarks/
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import pytest
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    """
+    The aibag module wired to a local fake Cohere server, with its caches, job store and images in
+    a temporary directory. Yields (aibag, server); server.requests counts the model calls.
+    """
+    import aibag
+    from fake_cohere import FakeCohereServer
+    from pipeline_benchmark import write_images
+
+    server = FakeCohereServer(latency=0, token_rate=1e6, article_sections=6, seed=0).start()
+    image_dir = tmp_path / 'images'
+    image_dir.mkdir()
+    write_images(str(image_dir))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(aibag, 'COHERE_API_KEY', 'test')
+    monkeypatch.setattr(aibag, 'COHERE_BASE_URL', server.url)
+    monkeypatch.setattr(aibag, 'LOG_FILE', open(os.devnull, 'w'))
+    monkeypatch.setattr(aibag, 'cache_mode', 'off')
+    monkeypatch.setattr(aibag, 'CACHE_PATH', str(tmp_path / 'responses.sqlite3'))
+    monkeypatch.setattr(aibag, '_response_cache', None)
+    monkeypatch.setattr(aibag, 'jobs_mode', 'resume')
+    monkeypatch.setattr(aibag, 'JOBS_PATH', str(tmp_path / 'jobs.sqlite3'))
+    monkeypatch.setattr(aibag, '_job_store', None)
+    monkeypatch.setattr(aibag, 'KEYWORD_MODE', 'llm')
+    monkeypatch.setattr(aibag, 'KEYWORD_CORPUS_PATH', str(tmp_path / 'corpus.sqlite3'))
+    monkeypatch.setattr(aibag, '_keyword_extractor', None)
+    monkeypatch.setattr(aibag, 'IMAGE_PROVIDER', str(image_dir))
+    monkeypatch.setattr(aibag, 'IMAGE_CACHE_PATH', str(tmp_path / 'image_cache'))
+    monkeypatch.setattr(aibag, '_image_provider', None)
+    monkeypatch.setattr(aibag, '_image_cache', None)
+    try:
+        yield aibag, server
+    finally:
+        server.stop()
+        aibag.LOG_FILE.close()
+        for store in (aibag._job_store, aibag._image_cache, aibag._response_cache):
+            if store is not None:
+                store.close()
+        if aibag._keyword_extractor is not None:
+            aibag._keyword_extractor.corpus.close()
@@ -0,0 +1,20 @@
+from context_budget import chunk_markdown, estimate_tokens
+from normalizer_benchmark import synthetic_article
+
+def test_chunks_fit_the_budget_and_rejoin():
+    text = synthetic_article(30)
+    chunks = chunk_markdown(text, 200)
+    assert len(chunks) > 1
+    assert '\n'.join(chunks) == text
+    assert all(estimate_tokens(chunk) <= 200 for chunk in chunks)
+
+def test_stripped_chunks_joined_like_the_callers_keep_every_block():
+    text = synthetic_article(30)
+    merged = '\n\n'.join(chunk.strip() for chunk in chunk_markdown(text, 200))
+    assert merged.split() == text.split()
+    # Every chunk after the first starts a new block
+    assert all(f"\n\n{chunk.strip()}" in merged for chunk in chunk_markdown(text, 200)[1:])
+
+def test_small_text_is_one_chunk():
+    assert chunk_markdown("# Title\n\nBody", 200) == ["# Title\n\nBody"]
+    assert chunk_markdown("# Title\n\nBody", 0) == ["# Title\n\nBody"]
@@ -0,0 +1,186 @@
+import asyncio
+import os
+import struct
+import zlib
+
+import httpx
+import pytest
+
+import image_assets
+from image_assets import DirectoryImageProvider, ImageCache, LoremFlickrProvider, image_size, link_assets
+from renderers import render_markdown, sized_images
+
+def png(width, height):
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    header = chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+    return b'\x89PNG\r\n\x1a\n' + header + chunk(b'IDAT', zlib.compress(b'\x00' * (3 * width + 1) * height)) + chunk(b'IEND', b'')
+
+def gif(width, height):
+    return b'GIF89a' + struct.pack('<HH', width, height) + b'\x00\x00\x00;'
+
+def webp(chunk, payload):
+    return b'RIFF' + struct.pack('<I', 4 + 8 + len(payload)) + b'WEBP' + chunk + struct.pack('<I', len(payload)) + payload
+
+def webp_lossy(width, height):
+    # Frame tag, start code, then the 14-bit dimensions (the top two bits are the scale)
+    return webp(b'VP8 ', b'\x00' * 3 + b'\x9d\x01\x2a' + struct.pack('<HH', width | 0x4000, height) + b'\x00' * 10)
+
+def webp_lossless(width, height):
+    bits = (width - 1) | ((height - 1) << 14)
+    return webp(b'VP8L', b'\x2f' + bits.to_bytes(4, 'little') + b'\x00' * 8)
+
+def webp_extended(width, height):
+    return webp(b'VP8X', b'\x00' * 4 + (width - 1).to_bytes(3, 'little') + (height - 1).to_bytes(3, 'little'))
+
+def jpeg(width, height):
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + b'\x00' * 9
+    # A Huffman table segment comes before the frame and must be skipped (0xc4 is not a frame marker)
+    dht = b'\xff\xc4' + struct.pack('>H', 5) + b'\x00\x00\x00'
+    sof = b'\xff\xc2' + struct.pack('>HBHHB', 11, 8, height, width, 1) + b'\x01\x11\x00'
+    return b'\xff\xd8' + app0 + dht + b'\xff' + sof + b'\xff\xd9'
+
+@pytest.mark.parametrize('data, expected', [
+    (png(80, 60), ('png', 80, 60)),
+    (gif(16, 9), ('gif', 16, 9)),
+    (webp_lossy(800, 600), ('webp', 800, 600)),
+    (webp_lossless(1, 16384), ('webp', 1, 16384)),
+    (webp_extended(4000, 3000), ('webp', 4000, 3000)),
+    (jpeg(1024, 768), ('jpeg', 1024, 768)),
+])
+def test_image_size(data, expected):
+    assert image_size(data) == expected
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'<html>not an image</html>',
+    png(80, 60)[:20],
+    gif(16, 9)[:8],
+    webp_lossy(800, 600)[:28],
+    webp_lossless(10, 10)[:22],
+    webp_extended(10, 10)[:27],
+    jpeg(1024, 768)[:30],
+    b'\xff\xd8\x00\x00' + b'\x00' * 20,
+    png(0, 60),
+    gif(16, 0),
+])
+def test_image_size_rejects_truncated_and_invalid_data(data):
+    with pytest.raises(ValueError):
+        image_size(data)
+
+def test_image_cache_hit_and_miss(tmp_path):
+    cache = ImageCache(str(tmp_path / 'cache'))
+    assert cache.get('dir:x', 'solar panels') is None
+    file, width, height = cache.put('dir:x', 'solar panels', png(80, 60))
+    assert (width, height) == (80, 60) and file.endswith('.png')
+    assert cache.get('dir:x', 'solar panels') == (file, 80, 60)
+    # Another provider or keyword is a miss; the same image content is stored once
+    assert cache.get('loremflickr:800x600', 'solar panels') is None
+    assert cache.put('dir:x', 'wind turbines', png(80, 60))[0] == file
+    assert os.listdir(tmp_path / 'cache').count(file) == 1
+    # A cached entry whose file disappeared is a miss
+    os.remove(cache.path(file))
+    assert cache.get('dir:x', 'solar panels') is None
+    cache.close()
+
+    cache = ImageCache(str(tmp_path / 'cache'))
+    with pytest.raises(ValueError):
+        cache.put('dir:x', 'broken', b'<html>')
+    assert cache.get('dir:x', 'broken') is None
+    cache.close()
+
+def test_link_assets_and_sized_images(tmp_path):
+    cache = ImageCache(str(tmp_path / 'cache'))
+    file, _, _ = cache.put('dir:x', 'solar', png(80, 60))
+    markdown = (
+        f"# Solar\n![solar](assets/{file})\n\n## Remote\n![remote](https://example.com/a.png)\n"
+        f"![again](assets/{file})\n![missing](assets/0000000000000000.png)"
+    )
+    assets = tmp_path / 'out' / 'assets'
+    images = link_assets(markdown, cache, str(assets), 'assets')
+    assert images == {f'assets/{file}': (80, 60)}
+    assert os.listdir(assets) == [file]
+
+    rendered = ''.join(render_markdown({'markdown': markdown, 'images': images}))
+    assert f'<img src="assets/{file}" alt="solar" width="80" height="60">' in rendered
+    assert f'<img src="assets/{file}" alt="again" width="80" height="60">' in rendered
+    assert '![remote](https://example.com/a.png)' in rendered
+    assert '![missing](assets/0000000000000000.png)' in rendered
+    assert ''.join(sized_images(markdown, {})) == markdown
+    cache.close()
+
+def test_link_assets_uses_the_cached_sizes(tmp_path, monkeypatch):
+    cache = ImageCache(str(tmp_path / 'cache'))
+    file, _, _ = cache.put('dir:x', 'solar', png(80, 60))
+    stray = tmp_path / 'out' / 'assets' / '1111111111111111.gif'
+    stray.parent.mkdir(parents=True)
+    stray.write_bytes(gif(16, 9))
+    read = []
+    monkeypatch.setattr(image_assets, 'image_size', lambda data: read.append(data) or image_size(data))
+    images = link_assets(f"![solar](assets/{file})\n![stray](assets/{stray.name})", cache, str(stray.parent), 'assets')
+    assert images == {f'assets/{file}': (80, 60), f'assets/{stray.name}': (16, 9)}
+    # Only the file the index doesn't know was read
+    assert read == [gif(16, 9)]
+    cache.close()
+
+def fetch_from(handler):
+    async def fetch():
+        provider = LoremFlickrProvider()
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            provider._clients[asyncio.get_running_loop()] = client
+            return await provider.fetch('solar panels')
+    return asyncio.run(fetch())
+
+def test_loremflickr_downloads_an_image():
+    image = png(8, 8)
+    assert fetch_from(lambda request: httpx.Response(200, headers={'content-type': 'image/png'}, content=image)) == image
+    with pytest.raises(ValueError, match='content type'):
+        fetch_from(lambda request: httpx.Response(200, headers={'content-type': 'text/html'}, content=b'<html>'))
+    with pytest.raises(httpx.HTTPStatusError):
+        fetch_from(lambda request: httpx.Response(503))
+
+def test_loremflickr_stops_reading_oversized_images(monkeypatch):
+    monkeypatch.setattr(image_assets, 'MAX_IMAGE_BYTES', 1000)
+    sent = []
+
+    async def body():
+        for _ in range(100):
+            sent.append(100)
+            yield b'\x00' * 100
+
+    # The declared length is rejected before the body is read
+    with pytest.raises(ValueError, match='larger than 1000 bytes'):
+        fetch_from(lambda request: httpx.Response(200, headers={'content-type': 'image/png', 'content-length': '10000'},
+                                                  content=body()))
+    assert sent == []
+    # Without one, the download stops as soon as the limit is passed
+    with pytest.raises(ValueError, match='larger than 1000 bytes'):
+        fetch_from(lambda request: httpx.Response(200, headers={'content-type': 'image/png'}, content=body()))
+    assert len(sent) == 11
+
+def test_directory_provider_prefers_matching_names(tmp_path):
+    for name in ('solar-panels', 'wind_turbine'):
+        (tmp_path / f'{name}.png').write_bytes(png(8, 8))
+    (tmp_path / 'notes.txt').write_text('not an image')
+    provider = DirectoryImageProvider(str(tmp_path))
+    assert len(provider.files) == 2
+
+    assert asyncio.run(provider.fetch('installing solar panels')) == (tmp_path / 'solar-panels.png').read_bytes()
+    # Keywords matching no file always get the same one
+    assert asyncio.run(provider.fetch('quantum computing')) == asyncio.run(provider.fetch('quantum computing'))
+
+def test_failed_loremflickr_download_is_hot_linked(pipeline, monkeypatch):
+    aibag, _ = pipeline
+
+    class Offline:
+        name = 'loremflickr:800x600'
+
+        async def fetch(self, keyword):
+            raise httpx.ConnectError('offline')
+
+    monkeypatch.setattr(aibag, '_image_provider', Offline())
+    # A directory provider has nothing to hot-link
+    assert asyncio.run(aibag.aresolve_image('solar panels, wind')) is None
+    monkeypatch.setattr(aibag, 'IMAGE_PROVIDER', 'loremflickr')
+    assert asyncio.run(aibag.aresolve_image('solar panels, wind')) == \
+        ('Image', aibag.generate_image_url('solar panels, wind'))
@@ -0,0 +1,98 @@
+from job_store import JobStore, make_job_key
+
+def model_calls(server):
+    return server.requests['chat'] + server.requests['generate']
+
+def test_make_job_key_ignores_render_options():
+    assert make_job_key('Topic', 500) == make_job_key('Topic', 500, None, 'English')
+    assert make_job_key('Topic', 500) != make_job_key('Topic', 600)
+    assert make_job_key('Topic', 500) != make_job_key('Topic', 500, language='French')
+
+def test_checkpoints_survive_reopening(tmp_path):
+    path = str(tmp_path / 'jobs' / 'jobs.sqlite3')
+    store = JobStore(path)
+    assert store.start('key', 'Topic') == {}
+    store.save('key', 'normalized', '# Topic')
+    store.save('key', 'description', 'About the topic')
+    store.finish('key', error='the description call failed')
+    store.close()
+
+    store = JobStore(path)
+    assert store.jobs('failed')[0]['error'] == 'the description call failed'
+    assert store.start('key', 'Topic') == {'normalized': '# Topic', 'description': 'About the topic'}
+    assert store.jobs('running')[0]['key'] == 'key'
+    store.finish('key', output_file='Topic.html')
+    assert store.jobs('done')[0]['output_file'] == 'Topic.html'
+    assert store.start('key', 'Topic', restart=True) == {}
+    store.close()
+
+def test_saved_article_is_skipped(pipeline):
+    aibag, server = pipeline
+    assert aibag.generate_blog('Solar panels', max_words=300, output_format='md') == 'Solar panels.md'
+    calls = model_calls(server)
+    assert calls > 0
+    assert aibag.generate_blog('Solar panels', max_words=300, output_format='md') == 'Solar panels.md'
+    assert model_calls(server) == calls
+
+def test_failed_run_resumes_from_its_checkpoints(pipeline, monkeypatch):
+    aibag, server = pipeline
+    write_article = aibag.write_article
+
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(aibag, 'write_article', fail)
+    assert aibag.generate_blog('Solar panels', max_words=300, output_format='md') is None
+    calls = model_calls(server)
+    monkeypatch.setattr(aibag, 'write_article', write_article)
+    assert aibag.generate_blog('Solar panels', max_words=300, output_format='md') == 'Solar panels.md'
+    assert model_calls(server) == calls
+
+def test_render_settings_are_not_skipped(pipeline):
+    aibag, server = pipeline
+    aibag.generate_blog('Solar panels', max_words=300, output_format='md')
+    with open('Solar panels.md') as f:
+        plain = f.read()
+    calls = model_calls(server)
+
+    # md and github share the .md file, but the README reformat still has to run
+    assert aibag.generate_blog('Solar panels', max_words=300, output_format='github') == 'Solar panels.md'
+    assert model_calls(server) > calls
+    with open('Solar panels.md') as f:
+        assert f.read() != plain
+
+    # Another keyword mode renders the article again, from the saved content
+    chats = server.requests['chat']
+    assert aibag.generate_blog('Solar panels', max_words=300, output_format='md', keyword_mode='local') == 'Solar panels.md'
+    assert server.requests['chat'] == chats
+    checkpoints = aibag.get_job_store().start(aibag.make_job_key('Solar panels', 300), 'Solar panels')
+    assert f'rendered.md.local.{aibag.IMAGE_PROVIDER}' in checkpoints
+    assert f'rendered.github.llm.{aibag.IMAGE_PROVIDER}' in checkpoints
+
+def test_fallback_results_are_not_checkpointed(pipeline, monkeypatch):
+    aibag, server = pipeline
+    acohere_generate = aibag.acohere_generate
+    failed = []
+
+    async def flaky(prompt, *args, task=None, **kwargs):
+        if task in ('keywords', 'readme'):
+            failed.append(task)
+            raise RuntimeError(f'{task} call failed')
+        return await acohere_generate(prompt, *args, task=task, **kwargs)
+
+    monkeypatch.setattr(aibag, 'acohere_generate', flaky)
+    assert aibag.generate_blog('Solar panels', max_words=300, output_format='github') == 'Solar panels.md'
+    assert sorted(set(failed)) == ['keywords', 'readme']
+    key = aibag.make_job_key('Solar panels', 300)
+    checkpoints = aibag.get_job_store().start(key, 'Solar panels')
+    assert not any(stage.startswith(('keywords.', 'readme.', 'rendered.')) for stage in checkpoints)
+
+    # The next run retries the failed calls instead of skipping the saved article
+    monkeypatch.setattr(aibag, 'acohere_generate', acohere_generate)
+    calls = model_calls(server)
+    assert aibag.generate_blog('Solar panels', max_words=300, output_format='github') == 'Solar panels.md'
+    assert model_calls(server) > calls
+    checkpoints = aibag.get_job_store().start(key, 'Solar panels')
+    assert checkpoints['keywords.llm'] != 'default, keywords, here'
+    assert f'readme.llm.{aibag.IMAGE_PROVIDER}' in checkpoints
+    assert f'rendered.github.llm.{aibag.IMAGE_PROVIDER}' in checkpoints
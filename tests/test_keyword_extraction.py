@@ -0,0 +1,55 @@
+import threading
+
+from keyword_extraction import KeywordCorpus, KeywordExtractor
+
+ARTICLE = "# Solar panels\n\nSolar panels turn sunlight into power. Solar panels need little upkeep."
+
+def corpus_documents(aibag):
+    return aibag.get_keyword_extractor().corpus.document_frequencies([])[0]
+
+def test_extract_and_learn(tmp_path):
+    extractor = KeywordExtractor(KeywordCorpus(str(tmp_path / 'corpus.sqlite3')))
+    assert 'solar panels' in extractor.extract(ARTICLE)
+    extractor.learn(ARTICLE)
+    assert extractor.corpus.document_frequencies(['solar panels']) == (1, {'solar panels': 1})
+    extractor.corpus.close()
+
+def test_llm_mode_only_learns_the_article(pipeline, monkeypatch):
+    aibag, _ = pipeline
+    extractor = aibag.get_keyword_extractor()
+    extract = extractor.extract
+    threads = []
+
+    def forbidden(*args, **kwargs):
+        raise AssertionError('extract() should not run with model keywords')
+
+    def learn(markdown, learn=extractor.learn):
+        threads.append(threading.current_thread() is threading.main_thread())
+        learn(markdown)
+
+    monkeypatch.setattr(extractor, 'extract', forbidden)
+    monkeypatch.setattr(extractor, 'learn', learn)
+    aibag.generate_blog('Solar panels', max_words=300, output_format='md', keyword_mode='llm')
+    # Learned once, off the event loop thread
+    assert threads == [False]
+    assert corpus_documents(aibag) == 1
+
+    # Rendering again from the checkpoints doesn't count the article twice, whatever the mode
+    aibag.generate_blog('Solar panels', max_words=300, output_format='github', keyword_mode='llm')
+    monkeypatch.setattr(extractor, 'extract', extract)
+    aibag.generate_blog('Solar panels', max_words=300, output_format='md', keyword_mode='local')
+    assert corpus_documents(aibag) == 1
+
+def test_local_mode_extracts_off_the_loop(pipeline, monkeypatch):
+    aibag, _ = pipeline
+    extractor = aibag.get_keyword_extractor()
+    threads = []
+
+    def extract(markdown, limit=10, extract=extractor.extract):
+        threads.append(threading.current_thread() is threading.main_thread())
+        return extract(markdown, limit)
+
+    monkeypatch.setattr(extractor, 'extract', extract)
+    aibag.generate_blog('Solar panels', max_words=300, output_format='md', keyword_mode='local')
+    assert threads == [False]
+    assert corpus_documents(aibag) == 1
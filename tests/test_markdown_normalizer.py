@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from markdown_normalizer import DEFAULT_RULES, MarkdownNormalizer
+from normalizer_benchmark import legacy_normalize, new_normalize, synthetic_article
+
+ARTICLES = [
+    "",
+    "\n\n  \n",
+    "## Outline:\n## Article:\n",
+    "Just a paragraph without any heading",
+    "# H1: Title:\n\nBody text:\n## H2: Part:\nMore",
+    "## Outline:\n# H1: Title\n\n## Article:\n# H1: Title\n\n### H3: Detail::\ntext # not a heading\n",
+    "   # H1: Indented title:   \n\nbody\n\n   ## H2: Last heading:   \n\n",
+    "intro\n# Section one\ntext\n# Section two",
+    "# Title\r\n\r\n## H2: Windows line endings:\r\nbody\r\n",
+    "#",
+    "# H1: only a title:",
+]
+
+def feed_in_chunks(normalizer, text, size):
+    output = []
+    for start in range(0, len(text), size):
+        output += normalizer.feed(text[start:start + size])
+    return output + normalizer.finish()
+
+def random_article(rng):
+    pieces = ["## Outline:", "## Article:", "# H1: Title:", "## H2: Part:", "### H3: Detail",
+              "#### H4: Note:", "# Plain heading", "text with a # inside", "body:", "", "  ", "#"]
+    return '\n'.join(rng.choice(pieces) for _ in range(rng.randint(0, 30))) + rng.choice(["", "\n", "\n\n"])
+
+@pytest.mark.parametrize('article', ARTICLES)
+@pytest.mark.parametrize('chunk_size', [1, 3, 64, 100000])
+def test_normalize_matches_feed(article, chunk_size):
+    hook = lambda title: f"![Image]({title})"
+    assert MarkdownNormalizer('Topic', image_hook=hook).normalize(article) == \
+        feed_in_chunks(MarkdownNormalizer('Topic', image_hook=hook), article, chunk_size)
+    assert MarkdownNormalizer('Topic').normalize(article) == \
+        feed_in_chunks(MarkdownNormalizer('Topic'), article, chunk_size)
+
+def test_normalize_matches_feed_on_random_articles():
+    rng = random.Random(7)
+    for _ in range(500):
+        article = random_article(rng)
+        expected = feed_in_chunks(MarkdownNormalizer('Topic', image_hook=str.upper), article, rng.randint(1, 40))
+        assert MarkdownNormalizer('Topic', image_hook=str.upper).normalize(article) == expected
+
+@pytest.mark.parametrize('rules', [
+    DEFAULT_RULES + [(':', lambda line: line.replace('body:', 'body'))],
+    [(None, str.rstrip)] + DEFAULT_RULES,
+])
+def test_custom_rules_match_feed(rules):
+    rng = random.Random(3)
+    for _ in range(200):
+        article = random_article(rng)
+        assert MarkdownNormalizer('Topic', rules=rules).normalize(article) == \
+            feed_in_chunks(MarkdownNormalizer('Topic', rules=rules), article, 5)
+
+@pytest.mark.parametrize('sections', [1, 20, 200])
+def test_normalize_matches_legacy_cleanup(sections):
+    article = synthetic_article(sections)
+    assert new_normalize(article, 'Benchmark') == legacy_normalize(article, 'Benchmark')
+
+def test_normalizer_is_reusable():
+    normalizer = MarkdownNormalizer('Topic')
+    first = normalizer.normalize("## H2: Part:\nbody")
+    assert first == ["# Topic", "", "## Part", "body"]
+    assert normalizer.normalize("## H2: Part:\nbody") == first
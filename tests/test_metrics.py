@@ -0,0 +1,42 @@
+from metrics import MetricsRecorder, current_topic, percentile
+
+def test_percentile():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([3, 1, 2], 0.5) == 2
+    assert percentile(list(range(1, 101)), 0.95) == 95
+
+def test_summary_totals():
+    recorder = MetricsRecorder()
+    token = current_topic.set('Solar panels')
+    with recorder.stage('write') as stage:
+        stage['bytes'] = 100
+    current_topic.reset(token)
+    recorder.record('model_call', 'article', latency=1.0, input_tokens=10, output_tokens=None, retries=2)
+    recorder.record('model_call', 'article', latency=3.0, input_tokens=5, cache_hit=True)
+    recorder.record('stage', 'article', latency=2.0, status='error', peak_bytes=4096)
+    summary = recorder.summary()
+    assert summary[('stage', 'write')]['bytes'] == 100
+    assert recorder.events[0]['topic'] == 'Solar panels'
+    article = summary[('model_call', 'article')]
+    assert (article['count'], article['latency_sum'], article['p95']) == (2, 4.0, 3.0)
+    assert (article['input_tokens'], article['output_tokens'], article['retries'], article['cache_hits']) == (15, 0, 2, 1)
+    assert summary[('stage', 'article')]['errors'] == 1
+    assert summary[('stage', 'article')]['peak_bytes'] == 4096
+    assert 'aibag_stage_peak_bytes{stage="article"} 4096' in recorder.format_prometheus()
+
+def test_window_bounds_events_but_not_counters():
+    recorder = MetricsRecorder(window=100)
+    for index in range(1000):
+        recorder.record('stage', 'generate', latency=float(index), bytes=1)
+    assert len(recorder.events) == 100
+    generate = recorder.summary()[('stage', 'generate')]
+    assert (generate['count'], generate['bytes'], generate['latency_sum']) == (1000, 1000, sum(range(1000)))
+    # The quantiles only cover the latest 100 runs
+    assert generate['p50'] == 949.0
+    assert 'aibag_stage_latency_seconds_count{stage="generate"} 1000' in recorder.format_prometheus()
+
+def test_reset():
+    recorder = MetricsRecorder(window=10)
+    recorder.record('stage', 'generate', latency=1.0)
+    recorder.reset()
+    assert recorder.summary() == {} and not recorder.events
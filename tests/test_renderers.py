@@ -0,0 +1,23 @@
+import pytest
+
+from renderers import get_renderer, language_tag, render_html
+
+ARTICLE = {'title': 'Solar <panels>', 'description': 'About "panels"', 'keywords': 'solar, panels', 'markdown': '# Solar panels'}
+
+@pytest.mark.parametrize('language, tag', [
+    ('English', 'en'), ('French', 'fr'), ('  brazilian portuguese ', 'pt-BR'), ('pt-BR', 'pt-BR'),
+    ('de', 'de'), ('Klingon', 'en'), ('"><script>', 'en'), (None, 'en'),
+])
+def test_language_tag(language, tag):
+    assert language_tag(language) == tag
+
+def test_html_lang_follows_the_article_language():
+    assert '<html lang="en">' in ''.join(render_html(ARTICLE))
+    page = ''.join(render_html(dict(ARTICLE, language='Japanese')))
+    assert page.startswith('<!DOCTYPE html>\n<html lang="ja">\n\n   <head>')
+    assert '<title>Solar &lt;panels&gt;</title>' in page
+    assert 'content="About &quot;panels&quot;"' in page
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        get_renderer('pdf')
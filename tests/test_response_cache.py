@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, make_cache_key
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(response_cache.time, 'time', clock)
+    return clock
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / 'cache' / 'responses.sqlite3'), max_bytes=100, ttl=60)
+    yield cache
+    cache.close()
+
+def test_key_is_stable_and_independent_of_argument_order():
+    # Pinned, so a change to the key format (which would empty every user's cache) is noticed
+    assert make_cache_key('chat', 'command-r-plus', 'Hello', 0.3) == \
+        'f78c2c3c5b42ecc0db0df9fca57e21afcf6c2a8833d36f823e2b320ebbbf7037'
+    assert make_cache_key('generate', 'm', 'p', 0.5, 100) == \
+        make_cache_key(max_tokens=100, temperature=0.5, prompt='p', model='m', kind='generate')
+    assert make_cache_key('chat', 'm', 'p', 0.5) == make_cache_key('chat', 'm', 'p', 0.5, None)
+
+@pytest.mark.parametrize('other', [
+    ('generate', 'm', 'p', 0.5, None), ('chat', 'n', 'p', 0.5, None), ('chat', 'm', 'q', 0.5, None),
+    ('chat', 'm', 'p', 0.7, None), ('chat', 'm', 'p', 0.5, 100), ('chat', 'p', 'm', 0.5, None),
+])
+def test_key_changes_with_every_field(other):
+    assert make_cache_key('chat', 'm', 'p', 0.5) != make_cache_key(*other)
+
+def test_ttl_expiry(cache, clock):
+    cache.set('a', 'alpha')
+    clock.now += 59
+    assert cache.get('a') == 'alpha'
+    # Reading doesn't extend the lifetime: it counts from when the response was stored
+    clock.now += 2
+    assert cache.get('a') is None
+    clock.now -= 2
+    assert cache.get('a') is None
+
+def test_no_ttl(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / 'responses.sqlite3'), ttl=None)
+    cache.set('a', 'alpha')
+    clock.now += 10 ** 9
+    assert cache.get('a') == 'alpha'
+    cache.close()
+
+def test_lru_eviction_at_the_size_limit(cache, clock):
+    cache.set('a', 'a' * 40)
+    clock.now += 1
+    cache.set('b', 'b' * 40)
+    clock.now += 1
+    # Reading 'a' makes 'b' the least recently used entry
+    assert cache.get('a') == 'a' * 40
+    clock.now += 1
+    cache.set('c', 'c' * 40)
+    assert cache.get('b') is None
+    assert cache.get('a') == 'a' * 40
+    assert cache.get('c') == 'c' * 40
+
+def test_size_counts_utf8_bytes(cache, clock):
+    cache.set('a', 'é' * 30)
+    clock.now += 1
+    # 60 bytes + 50 bytes is over the 100 byte limit, although it is only 80 characters
+    cache.set('b', 'b' * 50)
+    assert cache.get('a') is None
+    assert cache.get('b') == 'b' * 50
+
+def test_replacing_an_entry_keeps_one_copy(cache, clock):
+    cache.set('a', 'a' * 60)
+    cache.set('a', 'A' * 60)
+    assert cache.get('a') == 'A' * 60
+
+def test_persists_across_reopening(tmp_path):
+    path = str(tmp_path / 'responses.sqlite3')
+    cache = ResponseCache(path)
+    cache.set('a', 'alpha')
+    cache.close()
+    cache = ResponseCache(path)
+    assert cache.get('a') == 'alpha'
+    cache.close()
+
+def generate(aibag):
+    return asyncio.run(aibag.acohere_generate('Cache me', max_tokens=20, temperature=0.3))
+
+def test_cache_modes(pipeline):
+    aibag, server = pipeline
+
+    aibag.configure_cache('use')
+    first = generate(aibag)
+    assert generate(aibag) == first
+    assert server.requests['generate'] == 1
+
+    # refresh skips the lookup but stores the fresh response
+    aibag.configure_cache('refresh')
+    generate(aibag)
+    assert server.requests['generate'] == 2
+    key = make_cache_key('generate', 'command-r-plus', 'Cache me', 0.3, 20)
+    assert aibag.get_response_cache().get(key) is not None
+
+    # off neither reads nor writes
+    aibag.get_response_cache().set(key, 'stale')
+    aibag.configure_cache('off')
+    assert aibag.get_response_cache() is None
+    assert generate(aibag) != 'stale'
+    assert server.requests['generate'] == 3
+    aibag.configure_cache('use')
+    assert generate(aibag) == 'stale'
+
+def test_invalid_cache_mode(pipeline):
+    aibag, _ = pipeline
+    with pytest.raises(ValueError):
+        aibag.configure_cache('sometimes')
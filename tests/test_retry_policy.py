@@ -0,0 +1,172 @@
+import asyncio
+import email.utils
+
+import pytest
+
+import retry_policy
+from retry_policy import RetryPolicy, TokenBucket, get_retry_after, parse_retry_after
+
+class FakeClock:
+    """
+    Stands in for time.time, time.monotonic and asyncio.sleep: sleeping only moves the clock.
+    """
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(retry_policy.time, 'time', clock)
+    monkeypatch.setattr(retry_policy.time, 'monotonic', clock)
+    monkeypatch.setattr(retry_policy.asyncio, 'sleep', clock.sleep)
+    return clock
+
+class ApiError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.headers = headers
+
+def test_parse_retry_after_seconds():
+    assert parse_retry_after({'retry-after': '7'}) == 7.0
+    assert parse_retry_after({'retry-after': '1.5'}) == 1.5
+    assert parse_retry_after({'retry-after': '-3'}) == 0.0
+    assert parse_retry_after({'retry-after-ms': '250', 'retry-after': '9'}) == 0.25
+    assert parse_retry_after({'retry-after-ms': 'soon', 'retry-after': '9'}) == 9.0
+    assert parse_retry_after({}) is None
+    assert parse_retry_after({'retry-after': 'whenever'}) is None
+
+def test_parse_retry_after_http_date(clock):
+    assert parse_retry_after({'retry-after': email.utils.formatdate(clock.now + 30, usegmt=True)}) == 30.0
+    assert parse_retry_after({'retry-after': email.utils.formatdate(clock.now - 30, usegmt=True)}) == 0.0
+
+def test_get_retry_after():
+    error = ApiError(429, {'retry-after': '4'})
+    assert get_retry_after(error) == 4.0
+    error.retry_after = 2.0
+    assert get_retry_after(error) == 2.0
+    assert get_retry_after(ValueError()) is None
+
+def test_backoff_bounds():
+    policy = RetryPolicy(base_delay=1.0, max_delay=10.0)
+    for attempt, ceiling in ((1, 1.0), (2, 2.0), (3, 4.0), (4, 8.0), (5, 10.0), (30, 10.0)):
+        delays = [policy.delay(attempt, ValueError()) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+        # Full jitter: the waits are spread over the whole range, not bunched at the ceiling
+        assert min(delays) < ceiling / 4 and max(delays) > ceiling * 3 / 4
+
+def test_retry_after_is_honoured_and_capped():
+    policy = RetryPolicy(base_delay=0.5, max_delay=10.0)
+    delays = [policy.delay(1, ApiError(429, {'retry-after': '3'})) for _ in range(200)]
+    assert all(3.0 <= delay <= 3.5 for delay in delays)
+    delays = [policy.delay(1, ApiError(503, {'retry-after': '3600'})) for _ in range(200)]
+    assert all(10.0 <= delay <= 10.5 for delay in delays)
+
+@pytest.mark.parametrize('error, retryable', [
+    (ApiError(429), True), (ApiError(503), True), (ApiError(408), True),
+    (ApiError(400), False), (ApiError(401), False), (ApiError(404), False),
+    (ConnectionResetError(), True), (asyncio.TimeoutError(), True), (ValueError(), False),
+])
+def test_is_retryable(error, retryable):
+    assert RetryPolicy().is_retryable(error) is retryable
+
+def test_run_stops_at_max_attempts(clock):
+    policy = RetryPolicy(max_attempts=3, base_delay=1.0)
+    calls = []
+    retries = []
+
+    async def failing():
+        calls.append(clock.now)
+        raise ApiError(503)
+
+    with pytest.raises(ApiError):
+        asyncio.run(policy.run(failing, on_retry=lambda attempt, error, delay: retries.append(attempt)))
+    assert len(calls) == 3
+    assert retries == [1, 2]
+    assert len(clock.sleeps) == 2
+
+def test_run_does_not_retry_fatal_errors(clock):
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        raise ApiError(400)
+
+    with pytest.raises(ApiError):
+        asyncio.run(RetryPolicy().run(failing))
+    assert calls == [1] and clock.sleeps == []
+
+def test_run_returns_after_a_transient_failure(clock):
+    outcomes = [ApiError(503), 'done']
+
+    async def flaky(suffix):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome + suffix
+
+    assert asyncio.run(RetryPolicy().run(flaky, '!')) == 'done!'
+
+def test_rate_limit_pauses_the_bucket(clock):
+    bucket = TokenBucket()
+    outcomes = [ApiError(429, {'retry-after': '5'}), 'done']
+
+    async def limited():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    policy = RetryPolicy(base_delay=0.0)
+    assert asyncio.run(policy.run(limited, rate_limiter=bucket)) == 'done'
+    assert bucket.paused_until == pytest.approx(clock.now)
+
+def test_bucket_without_rate_never_waits(clock):
+    bucket = TokenBucket()
+
+    async def acquire_many():
+        for _ in range(100):
+            await bucket.acquire()
+
+    asyncio.run(acquire_many())
+    assert clock.sleeps == []
+
+def test_bucket_refill_and_wait(clock):
+    # 120 requests per minute = 2 per second, with a burst of 2
+    bucket = TokenBucket(rate_per_minute=120)
+    assert bucket.capacity == 2.0
+    start = clock.now
+
+    async def acquire(count):
+        for _ in range(count):
+            await bucket.acquire()
+
+    asyncio.run(acquire(2))
+    assert clock.now == start
+    asyncio.run(acquire(4))
+    assert clock.now - start == pytest.approx(2.0)
+
+    # An idle bucket refills up to its capacity, not beyond
+    clock.now += 60
+    start = clock.now
+    asyncio.run(acquire(2))
+    assert clock.now == start
+    asyncio.run(acquire(1))
+    assert clock.now - start == pytest.approx(0.5)
+
+def test_bucket_pause(clock):
+    bucket = TokenBucket(rate_per_minute=600, burst=10)
+    bucket.pause(3)
+    bucket.pause(1)
+    start = clock.now
+    asyncio.run(bucket.acquire())
+    assert clock.now - start == pytest.approx(3.0)
@@ -0,0 +1,89 @@
+import gc
+import json
+import os
+import time
+
+import pytest
+
+from service import ArticleService, parse_article_request
+
+@pytest.fixture
+def service(tmp_path):
+    service = ArticleService(tenant_limit=1, workers=2, output_dir=str(tmp_path / 'articles'))
+    os.makedirs(service.output_dir)
+    yield service
+    service.close()
+
+def request(**fields):
+    return parse_article_request(json.dumps(dict({'max_words': 300}, **fields)).encode('utf-8'))
+
+def test_topic_is_not_used_as_a_path(service):
+    assert service.output_files(request(topic='/tmp/owned/x'))[0] == os.path.join(service.output_dir, 'tmp-owned-x')
+    assert service.output_files(request(topic='..'))[0] == os.path.join(service.output_dir, 'article')
+    assert service.output_files(request(topic='The Future of AI', file_name='future'))[0] == \
+        os.path.join(service.output_dir, 'future')
+
+def test_translations_stay_in_the_output_directory(service):
+    _, outputs = service.output_files(request(topic='Solar', translations=['/../../y', 'Brazilian Portuguese']))
+    root = os.path.realpath(service.output_dir)
+    assert outputs == [os.path.join(root, name) for name in ('solar.html', 'solar.y.html', 'solar.brazilian-portuguese.html')]
+
+@pytest.mark.parametrize('file_name', ['../x', '/tmp/x', '..', '-'])
+def test_file_name_must_be_plain(file_name):
+    with pytest.raises(ValueError):
+        request(topic='Solar', file_name=file_name)
+
+def test_symlink_out_of_the_output_directory_is_rejected(service, tmp_path):
+    os.symlink(str(tmp_path), os.path.join(service.output_dir, 'link.html'))
+    with pytest.raises(ValueError, match='outside the output directory'):
+        service.output_files(request(topic='Solar', file_name='link'))
+
+def test_generations_of_the_same_files_take_turns(pipeline, service, monkeypatch):
+    aibag, server = pipeline
+    agenerate_blog = aibag.agenerate_blog
+    running = []
+    overlaps = []
+
+    async def tracked(topic, **options):
+        overlaps.append(len(running))
+        running.append(topic)
+        try:
+            return await agenerate_blog(topic, **options)
+        finally:
+            running.remove(topic)
+
+    monkeypatch.setattr(aibag, 'agenerate_blog', tracked)
+    # Only the keyword mode differs: no coalescing, but the same output file and job
+    first, started_first = service.submit(request(topic='Solar panels', output_format='md'), 'a')
+    second, started_second = service.submit(request(topic='Solar panels', output_format='md', keyword_mode='local'), 'b')
+    assert started_first and started_second
+    assert first.done.wait(30) and second.done.wait(30)
+    assert first.error is None and second.error is None
+    assert overlaps == [0, 0]
+    assert first.result == second.result == os.path.join(service.output_dir, 'solar-panels.md')
+    # The second generation resumed from the first one's checkpoints instead of generating again
+    assert server.requests['chat'] == 1
+
+def test_published_lines_are_counted(pipeline, service):
+    generation, _ = service.submit(request(topic='Solar panels', output_format='md', stream=True), 'a')
+    subscriber = generation.subscribe()
+    assert generation.done.wait(30) and generation.error is None
+    assert generation.memory.buffers['published'] > 0
+    assert generation.memory.peak >= generation.memory.buffers['published']
+    lines = []
+    while not subscriber.empty():
+        batch = subscriber.get()
+        if isinstance(batch, list):
+            lines += batch
+    assert lines == generation.lines
+
+def test_idle_tenant_slots_are_dropped(pipeline, service):
+    generations = [service.submit(request(topic=f'Solar panels {tenant}', output_format='md'), tenant)[0]
+                   for tenant in ('a', 'b', 'c')]
+    assert all(generation.done.wait(30) and generation.error is None for generation in generations)
+    # The generations may still be leaving their slots when done is set
+    deadline = time.monotonic() + 5
+    while len(service._tenant_limits) and time.monotonic() < deadline:
+        gc.collect()
+        time.sleep(0.01)
+    assert len(service._tenant_limits) == 0